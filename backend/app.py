@@ -1,13 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
+import io
+import json
 import uuid
 import logging
 import time
 from werkzeug.utils import secure_filename
 
-from ocr.hindi_ocr import perform_hindi_ocr
-from qa.question_answer import qa_all
+from ocr.hindi_ocr import perform_hindi_ocr, get_engine_stats, OCR_MODE, OCR_RACE_POLICY, TESSERACT_STRATEGY
+from ocr.decode import read_image_size, check_pixel_budget, ImageTooLarge, OCR_MAX_SIDE
+from ocr.pages import iter_pages, ocr_pages, MULTI_PAGE_EXTENSIONS
+from qa.question_answer import qa_all, qa_stream, QG_MODEL_NAME, QA_MODEL_NAME
+from qa.sentence_cache import sentence_cache
+from qa.near_duplicates import NEAR_DUPLICATE_THRESHOLD
+from qa.decoding import resolve_tier
+from qa.contexts import QG_CONTEXT_TOKENS, QG_CONTEXT_OVERLAP
+from qa.rule_answers import RULE_ANSWER_THRESHOLD
+from core.model_registry import registry
+from core.result_cache import ResultCache, cache_key
+from core.jobs import JobManager, QueueFullError
+from core.batching import batcher_stats
+from core.metrics import metrics, SnapshotExporter, render_prometheus
+from core.torch_runtime import INFERENCE_PRECISION
+from core.inference_server import server_socket, get_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,89 +50,463 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Limit upload to 16MB
+# Limit upload to 16MB by default; raise MAX_UPLOAD_MB for large batch uploads
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_UPLOAD_MB", "16")) * 1024 * 1024
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Sentences processed per step by /api/ocr/stream; 1 emits each QA pair as soon as its sentence is done
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1"))
+
+# Default latency budget (seconds) for /api/ocr and /api/ocr/stream; unset means no budget
+QA_LATENCY_BUDGET = os.getenv("QA_LATENCY_BUDGET")
+
+# Anything that changes the output for the same image must be part of the cache key
+RESULT_CACHE_CONFIG = {
+    # Bump when a code change alters results for the same settings
+    'pipeline_version': 2,
+    'ocr_max_side': OCR_MAX_SIDE,
+    'ocr_mode': OCR_MODE,
+    'ocr_race_policy': OCR_RACE_POLICY,
+    'tesseract_strategy': TESSERACT_STRATEGY,
+    'qg_context_tokens': QG_CONTEXT_TOKENS,
+    'qg_context_overlap': QG_CONTEXT_OVERLAP,
+    'rule_answer_threshold': RULE_ANSWER_THRESHOLD,
+    'near_duplicate_threshold': NEAR_DUPLICATE_THRESHOLD,
+    'qg_model': QG_MODEL_NAME,
+    'qa_model': QA_MODEL_NAME,
+    'precision': INFERENCE_PRECISION
+}
+
+# Results are cached per image in memory and in a sqlite file shared by all workers
+if os.getenv("RESULT_CACHE", "1") != "0":
+    result_cache = ResultCache(
+        os.path.join(UPLOAD_FOLDER, 'result_cache.sqlite3'),
+        max_memory_entries=int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "128")),
+        max_disk_entries=int(os.getenv("RESULT_CACHE_DISK_ENTRIES", "10000")),
+        ttl=int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+    )
+else:
+    result_cache = None
+
+# Each worker shares its metrics through this directory so a scrape sees all of them
+metrics_exporter = SnapshotExporter(
+    metrics,
+    os.path.join(UPLOAD_FOLDER, 'metrics'),
+    interval=int(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+)
+
+@app.before_request
+def count_request():
+    metrics_exporter.start()
+    metrics.inc('requests_total', endpoint=request.endpoint or 'unknown')
+
+def allowed_file(filename, extensions=ALLOWED_EXTENSIONS):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in extensions
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'ok', 'message': 'Service is healthy'})
 
-@app.route('/api/ocr', methods=['POST'])
-def ocr_endpoint():
-    logger.info("OCR API endpoint called")
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    # Servers other than gunicorn don't call post_worker_init; the first probe starts the warm-up
+    registry.start_warm_up()
+    ready, models = registry.readiness()
+    return jsonify({'ready': ready, 'models': models}), 200 if ready else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(render_prometheus(metrics_exporter.collect()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/models', methods=['GET'])
+def models_status():
+    status = {
+        'models': registry.stats(),
+        'ocr_engine_wins': get_engine_stats(),
+        'inference_batching': batcher_stats()
+    }
+    if server_socket():
+        # The models themselves live in the shared inference server
+        try:
+            status['inference_server'] = get_client().stats()
+        except Exception as e:
+            status['inference_server'] = {'error': str(e)}
+    return jsonify(status)
+
+@app.route('/api/cache', methods=['GET'])
+def cache_status():
+    if result_cache is None:
+        return jsonify({'enabled': False, 'sentence_cache': sentence_cache.stats()})
+    return jsonify(dict(result_cache.stats(), enabled=True, sentence_cache=sentence_cache.stats()))
+
+def unusable_text_result(extracted_text):
+    """Return the canned response for OCR output that can't be used for QA, or None"""
+    if not extracted_text or extracted_text.isspace():
+        logger.warning("No text detected in the image")
+        metrics.inc('ocr_outcomes_total', outcome='no_text')
+        return {
+            'text': 'No text detected. Please try a clearer image with visible Hindi text.',
+            'qa_pairs': [
+                {
+                    'question': 'क्यों कोई पाठ नहीं मिला?',
+                    'answer': 'छवि में कोई पाठ नहीं मिला या OCR पहचान विफल रही। कृपया स्पष्ट हिंदी पाठ वाली एक अलग छवि का प्रयास करें।'
+                }
+            ]
+        }
+    
+    # Check for common OCR errors - all zeros
+    if all(c == '0' for c in extracted_text):
+        logger.warning("OCR returned all zeros - likely a recognition problem")
+        metrics.inc('ocr_outcomes_total', outcome='all_zeros')
+        return {
+            'text': 'OCR पहचान में समस्या। कृपया अधिक स्पष्ट छवि का प्रयास करें।',
+            'qa_pairs': [
+                {
+                    'question': 'OCR परिणाम क्यों सही नहीं है?',
+                    'answer': 'छवि सही से पहचानी नहीं गई। कृपया एक स्पष्ट छवि का प्रयास करें या सुनिश्चित करें कि छवि में हिंदी पाठ है।'
+                }
+            ]
+        }
+    
+    metrics.inc('ocr_outcomes_total', outcome='error' if extracted_text.startswith('Error') else 'text')
+    return None
+
+def run_ocr_pipeline(file, tier=None, budget=None):
+    """Run OCR and QA generation on an uploaded file and return the response payload
+
+    budget, in seconds, covers the whole pipeline; QA gets whatever OCR leaves of it.
+    """
     start_time = time.time()
+    logger.info("Starting OCR process on uploaded file")
+    
+    # Perform OCR directly on the file object without saving
+    ocr_details = {}
+    extracted_text = perform_hindi_ocr(file, ocr_details)
+    logger.info(f"OCR completed in {time.time() - start_time:.2f} seconds using {ocr_details.get('engine')}")
+    
+    canned = unusable_text_result(extracted_text)
+    if canned is not None:
+        return canned
+    
+    # Generate QA pairs from the extracted text
+    logger.info("Starting QA generation")
+    qa_start_time = time.time()
+    qa_details = {}
+    qa_budget = max(budget - (qa_start_time - start_time), 0) if budget is not None else None
+    with metrics.span('qa_pipeline'):
+        qa_pairs = qa_all(extracted_text, tier=tier, budget=qa_budget, details=qa_details)
+    logger.info(f"QA generation completed in {time.time() - qa_start_time:.2f} seconds")
+    
+    return {
+        'text': extracted_text,
+        'qa_pairs': qa_pairs,
+        'ocr_engine': ocr_details.get('engine'),
+        'image': ocr_details.get('image'),
+        'qa': qa_details.get('qa')
+    }
+
+def is_cacheable(result):
+    # perform_hindi_ocr reports decode/processing failures as text; never cache those
+    if result['text'].startswith('Error'):
+        return False
+    # Nor canned fallbacks (no text, all zeros, every engine failed): a transient failure
+    # such as EasyOCR not loading produces them too, and they would be served for the whole TTL
+    if result.get('ocr_engine') in (None, 'none'):
+        return False
+    # Nor results a latency budget cut short or downgraded; the key only records the requested tier
+    qa = result.get('qa')
+    return qa is None or (not qa['partial'] and all(used == qa['tier'] for used in qa['tiers_used']))
+
+def result_cache_key(image_bytes, tier):
+    return cache_key(image_bytes, dict(RESULT_CACHE_CONFIG, qg_tier=resolve_tier(tier)))
+
+def process_image_bytes(image_bytes, tier=None, budget=None):
+    """Return (result, cached) for an uploaded image, consulting the result cache first"""
+    key = None
+    if result_cache is not None:
+        key = result_cache_key(image_bytes, tier)
+        cached = result_cache.get(key)
+        if cached is not None:
+            logger.info("Returning cached OCR and QA result")
+            return cached, True
     
+    result = run_ocr_pipeline(io.BytesIO(image_bytes), tier, budget)
+    if key is not None and is_cacheable(result):
+        result_cache.set(key, result)
+    return result, False
+
+def get_uploaded_image():
+    """Return (file, None) for a valid upload, or (None, error response)"""
     if 'image' not in request.files:
         logger.warning("No image file in request")
-        return jsonify({'error': 'No image provided'}), 400
+        return None, (jsonify({'error': 'No image provided'}), 400)
     
     file = request.files['image']
     
     if file.filename == '':
         logger.warning("Empty filename in request")
-        return jsonify({'error': 'No file selected'}), 400
+        return None, (jsonify({'error': 'No file selected'}), 400)
     
-    if file and allowed_file(file.filename):
-        try:
-            logger.info("Starting OCR process on uploaded file")
-            
-            # Perform OCR directly on the file object without saving
-            extracted_text = perform_hindi_ocr(file)
-            logger.info(f"OCR completed in {time.time() - start_time:.2f} seconds")
-            
-            if not extracted_text or extracted_text.isspace():
-                logger.warning("No text detected in the image")
-                return jsonify({
-                    'text': 'No text detected. Please try a clearer image with visible Hindi text.',
-                    'qa_pairs': [
-                        {
-                            'question': 'क्यों कोई पाठ नहीं मिला?',
-                            'answer': 'छवि में कोई पाठ नहीं मिला या OCR पहचान विफल रही। कृपया स्पष्ट हिंदी पाठ वाली एक अलग छवि का प्रयास करें।'
-                        }
-                    ]
-                })
-            
-            # Check for common OCR errors - all zeros
-            if all(c == '0' for c in extracted_text):
-                logger.warning("OCR returned all zeros - likely a recognition problem")
-                return jsonify({
-                    'text': 'OCR पहचान में समस्या। कृपया अधिक स्पष्ट छवि का प्रयास करें।',
-                    'qa_pairs': [
-                        {
-                            'question': 'OCR परिणाम क्यों सही नहीं है?',
-                            'answer': 'छवि सही से पहचानी नहीं गई। कृपया एक स्पष्ट छवि का प्रयास करें या सुनिश्चित करें कि छवि में हिंदी पाठ है।'
-                        }
-                    ]
-                })
-            
-            # Generate QA pairs from the extracted text
-            logger.info("Starting QA generation")
-            qa_start_time = time.time()
-            qa_pairs = qa_all(extracted_text)
-            logger.info(f"QA generation completed in {time.time() - qa_start_time:.2f} seconds")
-            
-            # Calculate total processing time
-            total_time = time.time() - start_time
-            logger.info(f"Total request processed in {total_time:.2f} seconds")
-            
-            return jsonify({
-                'text': extracted_text,
-                'qa_pairs': qa_pairs,
-                'processing_time': f"{total_time:.2f} seconds"
-            })
+    if not allowed_file(file.filename):
+        logger.warning(f"Invalid file format: {file.filename}")
+        return None, (jsonify({'error': 'Invalid file format. Allowed formats are: ' + ', '.join(ALLOWED_EXTENSIONS)}), 400)
+    
+    # Only the header is read here; oversized images are turned away before anything is decoded
+    try:
+        size = read_image_size(file.stream)
+        if size is not None:
+            check_pixel_budget(*size)
+    except ImageTooLarge as e:
+        logger.warning(f"Rejected upload {file.filename}: {str(e)}")
+        return None, (jsonify({'error': str(e)}), 413)
+    finally:
+        file.seek(0)
+    
+    return file, None
+
+def get_qa_options():
+    """Return ((tier, budget), None) from the qa_tier / qa_budget request fields, or (None, error response)"""
+    tier = request.values.get('qa_tier') or None
+    budget = request.values.get('qa_budget') or QA_LATENCY_BUDGET
+    try:
+        tier = resolve_tier(tier)
+        budget = float(budget) if budget else None
+    except ValueError as e:
+        return None, (jsonify({'error': f"Invalid QA options: {str(e)}"}), 400)
+    if budget is not None and budget <= 0:
+        return None, (jsonify({'error': 'qa_budget must be a positive number of seconds'}), 400)
+    return (tier, budget), None
+
+@app.route('/api/ocr', methods=['POST'])
+def ocr_endpoint():
+    logger.info("OCR API endpoint called")
+    start_time = time.time()
+    
+    file, error = get_uploaded_image()
+    if error:
+        return error
+    options, error = get_qa_options()
+    if error:
+        return error
+    
+    try:
+        result, cached = process_image_bytes(file.read(), *options)
+        
+        # Calculate total processing time
+        total_time = time.time() - start_time
+        logger.info(f"Total request processed in {total_time:.2f} seconds")
+        metrics.observe('stage_duration_seconds', total_time, stage='request', cached=str(cached).lower())
         
+        return jsonify(dict(result, cached=cached, processing_time=f"{total_time:.2f} seconds"))
+    
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'An error occurred during processing.',
+            'message': str(e)
+        }), 500
+
+def stream_pipeline(image_bytes, tier=None, budget=None):
+    """Yield (event type, payload) pairs: the OCR text, then each QA pair, then a summary"""
+    start_time = time.time()
+    key = result_cache_key(image_bytes, tier) if result_cache is not None else None
+    cached = result_cache.get(key) if key is not None else None
+    if cached is not None:
+        logger.info("Streaming cached OCR and QA result")
+        yield 'text', {'text': cached['text'], 'ocr_engine': cached.get('ocr_engine'), 'image': cached.get('image'), 'cached': True}
+        for pair in cached['qa_pairs']:
+            yield 'qa_pair', pair
+        yield 'done', {
+            'qa_count': len(cached['qa_pairs']),
+            'qa': cached.get('qa'),
+            'cached': True,
+            'processing_time': f"{time.time() - start_time:.2f} seconds"
+        }
+        return
+    
+    ocr_details = {}
+    extracted_text = perform_hindi_ocr(io.BytesIO(image_bytes), ocr_details)
+    ocr_time = time.time() - start_time
+    logger.info(f"OCR completed in {ocr_time:.2f} seconds using {ocr_details.get('engine')}")
+    
+    result = unusable_text_result(extracted_text) or {
+        'text': extracted_text,
+        'qa_pairs': [],
+        'ocr_engine': ocr_details.get('engine'),
+        'image': ocr_details.get('image')
+    }
+    yield 'text', {
+        'text': result['text'],
+        'ocr_engine': result.get('ocr_engine'),
+        'image': result.get('image'),
+        'cached': False,
+        'ocr_time': f"{ocr_time:.2f} seconds"
+    }
+    
+    qa_start_time = time.time()
+    if result['qa_pairs']:
+        # Canned response for unusable text - nothing to generate
+        for pair in result['qa_pairs']:
+            yield 'qa_pair', pair
+    else:
+        qa_details = {}
+        qa_budget = max(budget - (qa_start_time - start_time), 0) if budget is not None else None
+        for pair in qa_stream(extracted_text, chunk_size=STREAM_CHUNK_SIZE, tier=tier, budget=qa_budget, details=qa_details):
+            result['qa_pairs'].append(pair)
+            yield 'qa_pair', pair
+        result['qa'] = qa_details.get('qa')
+    qa_time = time.time() - qa_start_time
+    
+    if key is not None and is_cacheable(result):
+        result_cache.set(key, result)
+    
+    total_time = time.time() - start_time
+    logger.info(f"Streamed request processed in {total_time:.2f} seconds")
+    yield 'done', {
+        'qa_count': len(result['qa_pairs']),
+        'qa': result.get('qa'),
+        'cached': False,
+        'ocr_time': f"{ocr_time:.2f} seconds",
+        'qa_time': f"{qa_time:.2f} seconds",
+        'processing_time': f"{total_time:.2f} seconds"
+    }
+
+def format_event(event, payload, use_sse):
+    data = json.dumps(dict(payload, type=event), ensure_ascii=False)
+    if use_sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + '\n'
+
+@app.route('/api/ocr/stream', methods=['POST'])
+def ocr_stream_endpoint():
+    logger.info("OCR stream API endpoint called")
+    
+    file, error = get_uploaded_image()
+    if error:
+        return error
+    
+    options, error = get_qa_options()
+    if error:
+        return error
+    
+    image_bytes = file.read()
+    use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+    
+    def generate():
+        try:
+            for event, payload in stream_pipeline(image_bytes, *options):
+                yield format_event(event, payload, use_sse)
         except Exception as e:
-            logger.error(f"Error processing request: {str(e)}", exc_info=True)
-            return jsonify({
+            logger.error(f"Error processing stream request: {str(e)}", exc_info=True)
+            yield format_event('error', {
                 'error': 'An error occurred during processing.',
                 'message': str(e)
-            }), 500
+            }, use_sse)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def run_job(image_bytes):
+    start_time = time.time()
+    result, cached = process_image_bytes(image_bytes)
+    return dict(result, cached=cached, processing_time=f"{time.time() - start_time:.2f} seconds")
+
+@app.route('/api/ocr/batch', methods=['POST'])
+def ocr_batch_endpoint():
+    logger.info("OCR batch API endpoint called")
+    start_time = time.time()
+    
+    files = request.files.getlist('images') + request.files.getlist('image')
+    files = [file for file in files if file.filename]
+    if not files:
+        logger.warning("No image files in batch request")
+        return jsonify({'error': 'No images provided'}), 400
     
-    logger.warning(f"Invalid file format: {file.filename}")
-    return jsonify({'error': 'Invalid file format. Allowed formats are: ' + ', '.join(ALLOWED_EXTENSIONS)}), 400
+    batch_extensions = ALLOWED_EXTENSIONS | MULTI_PAGE_EXTENSIONS
+    for file in files:
+        if not allowed_file(file.filename, batch_extensions):
+            logger.warning(f"Invalid file format: {file.filename}")
+            return jsonify({'error': 'Invalid file format. Allowed formats are: ' + ', '.join(sorted(batch_extensions))}), 400
+    
+    try:
+        pages = (
+            (file.filename, page_index, page_bytes)
+            for file in files
+            for page_index, page_bytes in enumerate(iter_pages(file, file.filename), 1)
+        )
+        page_results = ocr_pages(pages)
+        logger.info(f"OCR of {len(page_results)} pages completed in {time.time() - start_time:.2f} seconds")
+        
+        # Generate QA pairs over the text of all pages together
+        combined_text = '\n'.join(
+            page['text'] for page in page_results
+            if page['text'] and not page['text'].startswith('Error')
+        )
+        qa_start_time = time.time()
+        qa_pairs = qa_all(combined_text) if combined_text.strip() else []
+        qa_time = time.time() - qa_start_time
+        logger.info(f"QA generation completed in {qa_time:.2f} seconds")
+        
+        total_time = time.time() - start_time
+        logger.info(f"Batch request processed in {total_time:.2f} seconds")
+        
+        return jsonify({
+            'pages': page_results,
+            'text': combined_text,
+            'qa_pairs': qa_pairs,
+            'qa_time': f"{qa_time:.2f} seconds",
+            'processing_time': f"{total_time:.2f} seconds"
+        })
+    
+    except ValueError as e:
+        logger.warning(f"Unsupported batch upload: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error processing batch request: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'An error occurred during processing.',
+            'message': str(e)
+        }), 500
+
+# Background OCR jobs; their state lives on disk so any worker can serve it
+job_manager = JobManager(
+    os.path.join(UPLOAD_FOLDER, 'jobs'),
+    handler=run_job,
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+    ttl=int(os.getenv("JOB_TTL", str(24 * 3600)))
+)
+
+@app.route('/api/ocr/jobs', methods=['POST'])
+def create_ocr_job():
+    logger.info("OCR job API endpoint called")
+    
+    file, error = get_uploaded_image()
+    if error:
+        return error
+    
+    try:
+        job_id = job_manager.submit(file.read())
+    except QueueFullError as e:
+        logger.warning(str(e))
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f"/api/ocr/jobs/{job_id}"
+    }), 202
+
+@app.route('/api/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     logger.info("Starting Hindi OCR and QA Generator service")
+    registry.start_warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,114 @@
+"""Compare fp32 and int8 question generation / answer extraction
+
+Loads both precisions of the QG and QA models from the local Hugging Face
+cache, runs them over the same Hindi sentences and reports per-call latency,
+RSS growth, and how closely the int8 outputs match fp32:
+
+    cd backend
+    python -m bench.compare_precision --output precision.json
+"""
+import os
+
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+import json
+import time
+import difflib
+import argparse
+import logging
+
+from core.model_registry import get_rss_bytes
+from core.torch_runtime import configure_torch_threads
+from qa.question_answer import HindiQAGenerator, _load_qg_tokenizer, _load_qg_model, _load_qa_pipeline
+from bench.run_benchmark import summarize
+from bench.synthetic import SAMPLE_SENTENCES
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('fp32', 'int8')
+
+
+def run_precision(precision, tokenizer, sentences, repeats):
+    """Load one precision, run QG and QA over the sentences, return outputs and timings"""
+    rss_before = get_rss_bytes()
+    generator = HindiQAGenerator(
+        qg_tokenizer=tokenizer,
+        qg_model=_load_qg_model(precision),
+        qa_pipeline=_load_qa_pipeline(precision),
+        # Every answer must come from the model being compared
+        rule_answer_threshold=0
+    )
+    rss_growth = get_rss_bytes() - rss_before
+
+    qg_times, qa_times = [], []
+    questions, answers = [], []
+    for _ in range(repeats):
+        questions, answers = [], []
+        for sentence in sentences:
+            start = time.perf_counter()
+            generated = generator.generate_questions(sentence)
+            qg_times.append(time.perf_counter() - start)
+            question = generated[0] if generated else ''
+            questions.append(question)
+
+            start = time.perf_counter()
+            answers.append(generator.extract_answer(question, sentence) if question else '')
+            qa_times.append(time.perf_counter() - start)
+
+    return {
+        'rss_growth_bytes': rss_growth,
+        'question_generation': summarize(qg_times),
+        'answer_extraction': summarize(qa_times),
+        'questions': questions,
+        'answers': answers
+    }
+
+
+def agreement(reference, candidate):
+    """Exact-match rate and mean character similarity between two output lists"""
+    exact = sum(1 for a, b in zip(reference, candidate) if a == b)
+    similarity = sum(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, candidate))
+    return {
+        'exact_match': exact / len(reference) if reference else None,
+        'mean_similarity': similarity / len(reference) if reference else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3, help='passes over the sentences per precision')
+    parser.add_argument('--threads', type=int, default=1, help='torch intra-op threads, as one request thread would get')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    os.environ.setdefault('TORCH_INTRA_OP_THREADS', str(args.threads))
+    configure_torch_threads()
+    tokenizer = _load_qg_tokenizer()
+
+    results = {precision: run_precision(precision, tokenizer, SAMPLE_SENTENCES, args.repeats) for precision in PRECISIONS}
+    fp32, int8 = results['fp32'], results['int8']
+    report = {
+        'sentences': len(SAMPLE_SENTENCES),
+        'repeats': args.repeats,
+        'torch_threads': args.threads,
+        'precisions': results,
+        'int8_vs_fp32': {
+            'questions': agreement(fp32['questions'], int8['questions']),
+            'answers': agreement(fp32['answers'], int8['answers']),
+            'qg_p50_speedup': fp32['question_generation']['p50'] / int8['question_generation']['p50'],
+            'qa_p50_speedup': fp32['answer_extraction']['p50'] / int8['answer_extraction']['p50']
+        }
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        logger.info(f"Precision comparison written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
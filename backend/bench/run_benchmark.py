@@ -0,0 +1,324 @@
+"""Offline benchmark for the OCR and QA pipeline stages
+
+Renders synthetic Hindi pages, times each stage and prints a JSON report:
+
+    cd backend
+    python -m bench.run_benchmark --output bench.json
+    python -m bench.run_benchmark --compare before.json after.json
+
+Real models are used when they are already cached locally; anything missing
+is replaced by the deterministic stubs in bench/stubs.py. Nothing is
+downloaded.
+"""
+import os
+
+# Never reach out to the Hugging Face hub: use the local cache or fall back to stubs
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import logging
+from pathlib import Path
+
+from core.model_registry import registry, get_rss_bytes
+import ocr.hindi_ocr as hindi_ocr
+from ocr.decode import decode_image
+from qa.question_answer import HindiQAGenerator
+from bench import stubs
+from bench.synthetic import find_devanagari_font, page_text, render_page, encode_page
+
+logger = logging.getLogger(__name__)
+
+STAGES = ['decode', 'enhance', 'easyocr', 'tesseract', 'qg', 'qa']
+
+EASYOCR_MODEL_FILES = ['craft_mlt_25k.pth', 'devanagari.pth']
+
+
+def easyocr_models_cached():
+    model_dir = Path(os.getenv('EASYOCR_MODULE_PATH', Path.home() / '.EasyOCR')) / 'model'
+    return all((model_dir / name).exists() for name in EASYOCR_MODEL_FILES)
+
+
+def select_backends(force_stub):
+    """Load real models where cached, otherwise register stubs; returns stage -> 'real'/'stub'"""
+    backends = {}
+
+    if not force_stub and easyocr_models_cached() and _try_load('easyocr'):
+        backends['easyocr'] = 'real'
+    else:
+        registry.register('easyocr', stubs.StubReader, has_fallback=True)
+        backends['easyocr'] = 'stub'
+
+    if not force_stub and shutil.which(hindi_ocr.pytesseract.pytesseract.tesseract_cmd):
+        backends['tesseract'] = 'real'
+    else:
+        hindi_ocr.tesseract_to_string = stubs.stub_tesseract_to_string
+        hindi_ocr.tesseract_to_data = stubs.stub_tesseract_to_data
+        backends['tesseract'] = 'stub'
+
+    if not force_stub and _try_load('qg_tokenizer') and _try_load('qg_model'):
+        backends['qg'] = 'real'
+    else:
+        registry.register('qg_tokenizer', stubs.StubTokenizer)
+        registry.register('qg_model', stubs.StubQGModel)
+        backends['qg'] = 'stub'
+
+    if not force_stub and _try_load('qa_pipeline'):
+        backends['qa'] = 'real'
+    else:
+        registry.register('qa_pipeline', stubs.StubQAPipeline)
+        backends['qa'] = 'stub'
+
+    return backends
+
+
+def _try_load(name):
+    try:
+        return registry.get(name) is not None
+    except Exception:
+        return False
+
+
+def summarize(latencies):
+    """Latency percentiles (seconds) and throughput for one stage"""
+    values = sorted(latencies)
+    if not values:
+        return {'count': 0}
+
+    def percentile(p):
+        # Nearest-rank percentile
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+    total = sum(values)
+    return {
+        'count': len(values),
+        'mean': total / len(values),
+        'min': values[0],
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'max': values[-1],
+        'throughput_per_sec': len(values) / total if total else None
+    }
+
+
+def peak_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_page(generator, page_bytes, text, stages, timings):
+    """Run the selected stages over one page, appending each latency to timings"""
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    image = timed('decode', lambda data: decode_image(data)[0], page_bytes)
+    # Materialize the variant Tesseract reads, as perform_hindi_ocr would
+    variants = timed('enhance', lambda img: _materialize(hindi_ocr.enhance_image_for_hindi_ocr(img)), image)
+
+    if 'easyocr' in stages:
+        timed('easyocr', hindi_ocr.use_easyocr, variants)
+    if 'tesseract' in stages:
+        timed('tesseract', hindi_ocr.use_tesseract_for_hindi, variants)
+
+    # QG/QA run on the ground-truth text so their timings don't depend on OCR quality
+    contexts = [window.text for window in generator.build_contexts(generator.preprocess_text(text))]
+    questions = []
+    if 'qg' in stages or 'qa' in stages:
+        questions = timed('qg', generator.generate_questions_batch, contexts)
+    if 'qa' in stages:
+        pairs = [(q, c) for c, qs in zip(contexts, questions) for q in qs]
+        timed('qa', generator.extract_answers_batch, pairs)
+
+
+def _materialize(variants):
+    variants.get('enhanced')
+    return variants
+
+
+def run_benchmark(args):
+    stages = [stage for stage in args.stages.split(',') if stage]
+    backends = select_backends(args.stub)
+    font_path = args.font or find_devanagari_font()
+    generator = HindiQAGenerator()
+
+    resolutions = [tuple(int(v) for v in r.split('x')) for r in args.resolutions.split(',')]
+    noise_levels = [float(n) for n in args.noise.split(',')]
+
+    all_timings = {}
+    cases = {}
+    pages = 0
+    rss_start = get_rss_bytes()
+    wall_start = time.perf_counter()
+
+    for width, height in resolutions:
+        for noise in noise_levels:
+            case = f"{width}x{height}@{noise}"
+            logger.info(f"Benchmarking {case}")
+            case_timings = {}
+            for iteration in range(args.warmup + args.iterations):
+                text = page_text(seed=iteration)
+                page_bytes = encode_page(render_page(text, width, height, noise, font_path, seed=iteration))
+                timings = {}
+                run_page(generator, page_bytes, text, stages, timings)
+                if iteration < args.warmup:
+                    continue
+                pages += 1
+                for stage, values in timings.items():
+                    case_timings.setdefault(stage, []).extend(values)
+                    all_timings.setdefault(stage, []).extend(values)
+            cases[case] = {stage: summarize(values) for stage, values in case_timings.items()}
+
+    wall_time = time.perf_counter() - wall_start
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'backends': backends,
+            'font': font_path
+        },
+        'config': {
+            'resolutions': args.resolutions,
+            'noise': args.noise,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'stages': stages
+        },
+        'pages': pages,
+        'wall_time': wall_time,
+        'pages_per_sec': pages / wall_time if wall_time else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'rss_growth_bytes': get_rss_bytes() - rss_start,
+        'models': registry.stats(),
+        'stages': {stage: summarize(values) for stage, values in all_timings.items()},
+        'cases': cases
+    }
+
+
+def agreement_rate(reference, candidate):
+    return sum(1 for a, b in zip(reference, candidate) if a == b) / len(reference) if reference else None
+
+
+def compare_batching(args):
+    """Time batched against one-at-a-time question generation and answer extraction over the same pages"""
+    backends = select_backends(args.stub)
+    # Every answer must come from the pipeline being timed
+    generator = HindiQAGenerator(rule_answer_threshold=0)
+    times = {stage: {'batched': [], 'unbatched': []} for stage in ('qg', 'qa')}
+    outputs = {stage: {'batched': [], 'unbatched': []} for stage in ('qg', 'qa')}
+
+    def record(stage, mode, run, measured):
+        start = time.perf_counter()
+        result = run()
+        if measured:
+            times[stage][mode].append(time.perf_counter() - start)
+            outputs[stage][mode].extend(result)
+        return result
+
+    for iteration in range(args.warmup + args.iterations):
+        measured = iteration >= args.warmup
+        text = page_text(seed=iteration)
+        contexts = [window.text for window in generator.build_contexts(generator.preprocess_text(text))]
+
+        questions = record('qg', 'batched', lambda: generator.generate_questions_batch(contexts), measured)
+        record('qg', 'unbatched', lambda: [generator.generate_questions(context) for context in contexts], measured)
+
+        pairs = [(q, c) for c, qs in zip(contexts, questions) for q in qs]
+        record('qa', 'batched', lambda: generator.extract_answers_batch(pairs), measured)
+        record('qa', 'unbatched', lambda: [generator.extract_answer(q, c) for q, c in pairs], measured)
+
+    report = {'meta': {'commit': git_commit(), 'backends': backends}}
+    for stage in times:
+        batched, unbatched = times[stage]['batched'], times[stage]['unbatched']
+        report[stage] = {
+            'items': len(outputs[stage]['unbatched']),
+            'batched': summarize(batched),
+            'unbatched': summarize(unbatched),
+            'speedup': sum(unbatched) / sum(batched) if sum(batched) else None,
+            # Below 1.0 means batching changed outputs (expected for questions only with QG_PADDED_BATCHES=1)
+            'agreement': agreement_rate(outputs[stage]['unbatched'], outputs[stage]['batched'])
+        }
+    return report
+
+
+def compare(before_path, after_path):
+    """Print per-stage p50/p95 changes between two benchmark reports"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{'stage':<12}{'p50 before':>12}{'p50 after':>12}{'change':>9}{'p95 before':>12}{'p95 after':>12}{'change':>9}")
+    for stage in STAGES:
+        if stage not in before['stages'] or stage not in after['stages']:
+            continue
+        row = f"{stage:<12}"
+        for key in ('p50', 'p95'):
+            old, new = before['stages'][stage][key], after['stages'][stage][key]
+            change = (new - old) / old * 100 if old else 0.0
+            row += f"{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{change:>+8.1f}%"
+        print(row)
+    for name, report in (('before', before), ('after', after)):
+        print(f"{name}: {report['pages_per_sec']:.2f} pages/sec, peak RSS {report['peak_rss_bytes'] / 2**20:.0f} MB, "
+              f"backends {report['meta']['backends']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resolutions', default='800x1000,1600x2000,2480x3508',
+                        help='comma-separated WIDTHxHEIGHT page sizes')
+    parser.add_argument('--noise', default='0,0.05,0.15',
+                        help='comma-separated noise levels (pixel noise std as a fraction of 255)')
+    parser.add_argument('--iterations', type=int, default=5, help='measured pages per case')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured pages per case')
+    parser.add_argument('--stages', default=','.join(STAGES[2:]),
+                        help='model stages to run (decode and enhance always run)')
+    parser.add_argument('--font', help='path to a Devanagari TTF font')
+    parser.add_argument('--stub', action='store_true', help='use stub models even if real ones are cached')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two reports and exit')
+    parser.add_argument('--compare-batching', action='store_true',
+                        help='time batched against one-at-a-time QG and QA over the page texts and report their agreement')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = compare_batching(args) if args.compare_batching else run_benchmark(args)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        logger.info(f"Benchmark report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Deterministic stand-ins for the OCR and QA models
+
+Used by the benchmark when the real models are not cached locally, so the
+surrounding pipeline code (preprocessing, batching, answer fallbacks) can
+still be timed offline. The outputs are derived from the inputs only.
+"""
+import hashlib
+
+from bench.synthetic import SAMPLE_SENTENCES
+
+
+def _pick(data, choices):
+    digest = hashlib.sha256(data).digest()
+    return choices[digest[0] % len(choices)]
+
+
+class StubReader:
+    """Mimics easyocr.Reader.readtext / readtext_batched"""
+
+    def readtext(self, image, **kwargs):
+        return [_pick(image.tobytes()[:4096], SAMPLE_SENTENCES), _pick(image.tobytes()[-4096:], SAMPLE_SENTENCES)]
+
+    def readtext_batched(self, images, **kwargs):
+        return [self.readtext(image, **kwargs) for image in images]
+
+
+class StubEncoding(dict):
+    pass
+
+
+PAD = '<pad>'
+
+
+class StubTokenizer:
+    """Mimics the QG tokenizer: one token per word, padded to the longest input when asked"""
+
+    def __call__(self, texts, padding=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        tokens = [self.tokenize(text) for text in texts]
+        longest = max(len(words) for words in tokens) if padding else 0
+        return StubEncoding(input_ids=[words + [PAD] * (longest - len(words)) for words in tokens])
+
+    def tokenize(self, text):
+        return text.split()
+
+    def decode(self, output, skip_special_tokens=True):
+        return output
+
+
+class StubQGModel:
+    """Turns 'generate question: <sentence>' into a question about the sentence
+
+    Like beam search in a real model, the output changes when the input was
+    padded, so a batch that mixes input lengths shows up as disagreement
+    with decoding each sentence alone.
+    """
+
+    def generate(self, input_ids, **kwargs):
+        questions = []
+        for tokens in input_ids:
+            words = [word for word in tokens if word != PAD][2:]
+            questions.append(' '.join(words[:4]) + (' क्या था?' if PAD in tokens else ' क्या है?'))
+        return questions
+
+
+class StubQAPipeline:
+    """Mimics the question-answering pipeline: answers with the first clause of the context"""
+
+    def _answer(self, question, context):
+        answer = context.split('।')[0].split(' और ')[0].strip()
+        score = (hashlib.sha256(question.encode('utf-8')).digest()[0] % 100) / 100
+        return {'answer': answer, 'score': score, 'start': 0, 'end': len(answer)}
+
+    def __call__(self, question, context, **kwargs):
+        if isinstance(question, str):
+            return self._answer(question, context)
+        return [self._answer(q, c) for q, c in zip(question, context)]
+
+
+def stub_tesseract_to_string(image, config, cancel_event=None, image_path=None):
+    return _pick(image.tobytes()[:4096], SAMPLE_SENTENCES)
+
+
+def stub_tesseract_to_data(image, config, cancel_event=None, image_path=None):
+    return _pick(image.tobytes()[:4096], SAMPLE_SENTENCES), 80.0
@@ -0,0 +1,101 @@
+import io
+import glob
+import functools
+import random
+import logging
+import textwrap
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Sentences used to fill synthetic pages
+SAMPLE_SENTENCES = [
+    "ताजमहल भारत के आगरा शहर में यमुना नदी के किनारे स्थित है।",
+    "इसका निर्माण मुगल बादशाह शाहजहाँ ने अपनी पत्नी मुमताज़ महल की याद में करवाया था।",
+    "ताजमहल को 1983 में यूनेस्को की विश्व धरोहर स्थल घोषित किया गया था।",
+    "यह संगमरमर से बना है और इसका निर्माण 1632 में शुरू हुआ था और 1653 में पूरा हुआ था।",
+    "इसे बनाने में लगभग बीस हज़ार कारीगरों ने काम किया था।",
+    "गंगा नदी हिमालय के गंगोत्री हिमनद से निकलती है और बंगाल की खाड़ी में गिरती है।",
+    "महात्मा गांधी का जन्म 1869 में पोरबंदर में हुआ था।",
+    "भारत का संविधान 26 जनवरी 1950 को लागू हुआ था।",
+]
+
+# Common install locations of fonts with Devanagari glyphs
+FONT_PATTERNS = [
+    '/usr/share/fonts/**/NotoSansDevanagari*.ttf',
+    '/usr/share/fonts/**/NotoSerifDevanagari*.ttf',
+    '/usr/share/fonts/**/Lohit-Devanagari.ttf',
+    '/usr/share/fonts/**/*Devanagari*.tt[fc]',
+    '/Library/Fonts/*Devanagari*.tt[fc]',
+    '/System/Library/Fonts/Supplemental/*Devanagari*.tt[fc]',
+    'C:\\Windows\\Fonts\\mangal.ttf',
+    'C:\\Windows\\Fonts\\Nirmala.ttf',
+]
+
+
+def find_devanagari_font():
+    """Return the path of a locally installed Devanagari font, or None"""
+    for pattern in FONT_PATTERNS:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if matches:
+            return matches[0]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(font_path, size):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    logger.warning("No Devanagari font found; glyphs will not render correctly")
+    return ImageFont.load_default()
+
+
+def page_text(seed, sentences=12):
+    """Deterministic page text built from the sample sentences"""
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(SAMPLE_SENTENCES) for _ in range(sentences))
+
+
+def render_page(text, width, height, noise=0.0, font_path=None, seed=0):
+    """Render text onto a white page and degrade it with the given noise level
+
+    noise is the standard deviation of Gaussian pixel noise as a fraction of
+    the full range; above 0.1 the page is also slightly blurred and rotated,
+    roughly like a phone photo of a printed page.
+    """
+    # Aim for ~40 text lines per page, like a printed textbook page
+    font_size = max(height // 60, 10)
+    font = load_font(font_path, font_size)
+
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    margin = width // 12
+    chars_per_line = max(int((width - 2 * margin) / (font_size * 0.55)), 10)
+    y = margin
+    for line in textwrap.wrap(text, chars_per_line):
+        if y + font_size * 1.6 > height - margin:
+            break
+        draw.text((margin, y), line, fill=0, font=font)
+        y += int(font_size * 1.6)
+
+    if noise > 0.1:
+        page = page.filter(ImageFilter.GaussianBlur(radius=1))
+        page = page.rotate(1.5, expand=False, fillcolor=255)
+
+    pixels = np.asarray(page, dtype=np.float32)
+    if noise > 0:
+        rng = np.random.default_rng(seed)
+        pixels = pixels + rng.normal(0, noise * 255, pixels.shape)
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels).convert('RGB')
+
+
+def encode_page(image, format='PNG'):
+    """Encode a rendered page the way it would arrive as an upload"""
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
@@ -0,0 +1,134 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cross-request batching is off by default; it trades up to MAX_WAIT_MS of latency for fewer, larger forward passes
+BATCHING_ENABLED = os.getenv("INFERENCE_BATCHING", "0") == "1"
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """Collects items submitted from many threads and runs them through fn in batches
+
+    fn receives a list of items and must return a list of results in the same
+    order. A batch is dispatched when it reaches max_batch_size or when the
+    oldest queued item has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, name, fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'items': 0,
+            'errors': 0,
+            'max_queue_depth': 0,
+            'total_wait_seconds': 0.0,
+            'batch_sizes': {}
+        }
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit_many(self, items):
+        """Queue several items and block until all of their results are ready"""
+        self._ensure_thread()
+        futures = []
+        now = time.monotonic()
+        for item in items:
+            future = Future()
+            self._queue.put((item, future, now))
+            futures.append(future)
+        with self._lock:
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        return [future.result() for future in futures]
+
+    def submit(self, item):
+        """Queue one item and block until its result is ready"""
+        return self.submit_many([item])[0]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Items that are already queued are always taken, even past the deadline
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(batch)
+                self._stats['total_wait_seconds'] += sum(started - queued for _, _, queued in batch)
+                sizes = self._stats['batch_sizes']
+                sizes[len(batch)] = sizes.get(len(batch), 0) + 1
+
+            try:
+                results = self.fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed in {self.name}: {str(e)}")
+                with self._lock:
+                    self._stats['errors'] += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        """Return queue depth and batch-size statistics"""
+        with self._lock:
+            stats = dict(self._stats, batch_sizes=dict(self._stats['batch_sizes']))
+        stats['queue_depth'] = self._queue.qsize()
+        stats['mean_batch_size'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        stats['mean_wait_ms'] = 1000 * stats.pop('total_wait_seconds') / stats['items'] if stats['items'] else 0.0
+        return stats
+
+
+def get_batcher(name, fn):
+    """Return the process-wide batcher for name, creating it around fn on first use"""
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = MicroBatcher(name, fn)
+        return _batchers[name]
+
+
+def batcher_stats():
+    """Return statistics for every batcher created in this process"""
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {
+        'enabled': BATCHING_ENABLED,
+        'max_batch_size': MAX_BATCH_SIZE,
+        'max_wait_ms': MAX_WAIT_MS,
+        'batchers': {name: batcher.stats() for name, batcher in batchers.items()}
+    }
@@ -0,0 +1,280 @@
+"""Offline OCR (and optionally QA) over a whole directory of scans
+
+Walks a directory, OCRs every image, multi-page TIFF and PDF in a process
+pool and appends one JSON line per file to the output:
+
+    cd backend
+    python -m core.bulk /data/scans --output scans.jsonl --qa
+
+Each pool process loads the models once and keeps them for every file it
+handles. Files are identified by the SHA-256 of their content, so after a
+crash or Ctrl-C the same command skips everything already written and
+carries on with the rest.
+"""
+import io
+import os
+import json
+import time
+import hashlib
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from ocr.pages import iter_pages, MULTI_PAGE_EXTENSIONS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'}
+BULK_EXTENSIONS = IMAGE_EXTENSIONS | MULTI_PAGE_EXTENSIONS
+
+# Seconds between throughput reports
+REPORT_INTERVAL = float(os.getenv("BULK_REPORT_INTERVAL", "10"))
+
+
+def find_files(root, extensions=BULK_EXTENSIONS):
+    """Paths of the supported files under root, in a stable order"""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if '.' in name and name.rsplit('.', 1)[1].lower() in extensions:
+                found.append(os.path.join(directory, name))
+    return found
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_options(with_qa=False, tier=None):
+    """Settings stored in every record; a rerun only skips files done with settings that cover its own"""
+    from qa.decoding import resolve_tier
+    return {'qa': with_qa, 'qa_tier': resolve_tier(tier) if with_qa else None}
+
+
+def covers(done, wanted):
+    """Whether a record written with options done satisfies a run with options wanted"""
+    if not wanted['qa']:
+        return True
+    return bool(done.get('qa')) and done.get('qa_tier') == wanted['qa_tier']
+
+
+def load_completed(output, options):
+    """Content hashes already written successfully to output under options that cover these
+
+    A line cut short by a crash is dropped from the file so new records
+    start on a line of their own. Files that failed, or that were done
+    without the QA (or with another tier) this run asks for, are not
+    counted and are processed again.
+    """
+    completed = set()
+    if not os.path.exists(output):
+        return completed
+    with open(output, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            logger.warning(f"Dropping an incomplete last record from {output}")
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('status') == 'ok' and covers(record.get('options', {}), options):
+            completed.add(record['sha256'])
+    return completed
+
+
+# Pool processes
+
+_with_qa = False
+
+
+def _init_worker(with_qa, processes):
+    """Load the models once per pool process"""
+    global _with_qa
+    _with_qa = with_qa
+    from core.model_registry import registry
+    from core.torch_runtime import configure_torch_threads
+    import ocr.hindi_ocr  # noqa: F401 - registers the EasyOCR loader
+    if with_qa:
+        import qa.question_answer  # noqa: F401 - registers the QG/QA loaders
+
+    configure_torch_threads(workers=processes)
+    registry.warm_up()
+
+
+def process_file(path, tier=None):
+    """OCR every page of one file, plus QA over their text if enabled; returns the record"""
+    from ocr.decode import ImageTooLarge
+    from ocr.hindi_ocr import perform_hindi_ocr
+
+    start_time = time.time()
+    record = {'status': 'ok', 'pages': []}
+    try:
+        with open(path, 'rb') as f:
+            for page_index, page_bytes in enumerate(iter_pages(f, path), 1):
+                details = {}
+                if isinstance(page_bytes, ImageTooLarge):
+                    text = f"Error: {str(page_bytes)}"
+                else:
+                    text = perform_hindi_ocr(io.BytesIO(page_bytes), details)
+                record['pages'].append({
+                    'page': page_index,
+                    'text': text,
+                    'ocr_engine': details.get('engine'),
+                    'image': details.get('image')
+                })
+    except Exception as e:
+        logger.error(f"Failed to OCR {path}: {str(e)}")
+        record.update(status='error', error=str(e))
+        return record
+
+    # Same convention as /api/ocr/batch: error pages are left out of the text
+    texts = [page['text'] for page in record['pages'] if page['text'] and not page['text'].startswith('Error')]
+    record['text'] = '\n'.join(texts)
+    if not texts and any(page['text'].startswith('Error') for page in record['pages']):
+        record.update(status='error', error=record['pages'][0]['text'])
+    record['ocr_seconds'] = round(time.time() - start_time, 3)
+
+    if _with_qa and record['text'].strip():
+        from qa.question_answer import qa_all
+
+        qa_start_time = time.time()
+        qa_details = {}
+        try:
+            record['qa_pairs'] = qa_all(record['text'], tier=tier, details=qa_details)
+        except Exception as e:
+            # A model failure on one file must not end the whole run
+            logger.error(f"Failed to generate QA pairs for {path}: {str(e)}")
+            record.update(status='error', error=str(e))
+            return record
+        record['qa'] = qa_details.get('qa')
+        record['qa_seconds'] = round(time.time() - qa_start_time, 3)
+    return record
+
+
+# Parent process
+
+class Throughput:
+    """Counts finished files and pages and logs the rate every interval seconds"""
+
+    def __init__(self, total, interval=REPORT_INTERVAL):
+        self.total = total
+        self.interval = interval
+        self.start = self.last_report = time.monotonic()
+        self.last_pages = 0
+        self.files = self.pages = self.skipped = self.errors = 0
+
+    def add(self, record):
+        self.files += 1
+        self.pages += len(record['pages'])
+        if record['status'] != 'ok':
+            self.errors += 1
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report()
+
+    def skip(self):
+        self.skipped += 1
+
+    def report(self, final=False):
+        now = time.monotonic()
+        elapsed = max(now - self.start, 1e-9)
+        recent = (self.pages - self.last_pages) / max(now - self.last_report, 1e-9)
+        self.last_report, self.last_pages = now, self.pages
+        remaining = self.total - self.files - self.skipped
+        message = (f"{self.files} files ({self.pages} pages) in {elapsed:.0f}s: {self.pages / elapsed:.2f} pages/sec"
+                   f" overall, {recent:.2f} recently; {self.skipped} skipped, {self.errors} failed")
+        logger.info(message if final else f"{message}, {remaining} files left")
+
+
+def run_bulk(root, output, with_qa=False, processes=None, tier=None):
+    """Process every supported file under root, appending records to output; returns the Throughput"""
+    processes = processes or os.cpu_count() or 1
+    options = run_options(with_qa, tier)
+    tier = options['qa_tier']
+    paths = find_files(root)
+    completed = load_completed(output, options)
+    progress = Throughput(len(paths))
+    logger.info(f"Found {len(paths)} files under {root}; {len(completed)} already done in {output}")
+
+    # spawn rather than fork, as in ocr.pages: forked torch threads can hang
+    pool = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(with_qa, processes)
+    )
+    max_in_flight = processes * 2
+    in_flight = {}
+
+    def write(done, out):
+        for future in done:
+            relative_path, sha256 = in_flight.pop(future)
+            record = dict(path=relative_path, sha256=sha256, options=options, **future.result())
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # Flushed per record so a crash loses at most the files still in flight
+            out.flush()
+            progress.add(record)
+
+    try:
+        with open(output, 'a', encoding='utf-8') as out:
+            for path in paths:
+                sha256 = file_sha256(path)
+                if sha256 in completed:
+                    progress.skip()
+                    continue
+                # Identical copies elsewhere in the tree are only processed once
+                completed.add(sha256)
+                in_flight[pool.submit(process_file, path, tier)] = (os.path.relpath(path, root), sha256)
+
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    write(done, out)
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                write(done, out)
+    except BrokenProcessPool:
+        logger.error("A pool process died; run the same command again to resume")
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        progress.report(final=True)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help='directory to walk')
+    parser.add_argument('--output', default='ocr_results.jsonl', help='JSONL file to append records to')
+    parser.add_argument('--qa', action='store_true', help='also generate QA pairs for each file')
+    parser.add_argument('--processes', type=int, default=int(os.getenv("OCR_PAGE_PROCESSES", str(os.cpu_count() or 1))),
+                        help='pool processes; each loads its own copy of the models')
+    parser.add_argument('--qa-tier', help='question decoding tier (see qa/decoding.py)')
+    args = parser.parse_args()
+
+    if args.qa_tier:
+        from qa.decoding import resolve_tier
+        try:
+            resolve_tier(args.qa_tier)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        run_bulk(args.root, args.output, args.qa, args.processes, args.qa_tier)
+    except KeyboardInterrupt:
+        logger.info("Interrupted; run the same command again to resume")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+"""Local inference server that owns the models for every gunicorn worker
+
+Run one server per host and point the workers at its socket:
+
+    cd backend
+    python -m core.inference_server --socket /tmp/hindi-ocr-inference.sock
+    INFERENCE_SERVER_SOCKET=/tmp/hindi-ocr-inference.sock gunicorn app:app
+
+Workers then register proxies in the model registry instead of loading
+EasyOCR and the QG/QA models themselves. Requests travel over a Unix socket;
+image arrays are written once into shared memory and read in place by the
+server, so only their name, shape and dtype go through the socket.
+
+Calls are pickled, so only clients that know the server's authkey are
+served: INFERENCE_SERVER_AUTHKEY if set (gunicorn.conf.py sets a random one
+for the server it starts), otherwise a key the server writes next to the
+socket, readable only by its own user. The socket itself is created with
+the same permissions.
+"""
+import os
+import time
+import queue
+import secrets
+import argparse
+import logging
+import threading
+from multiprocessing import connection, resource_tracker, shared_memory
+
+import numpy as np
+
+from core.model_registry import registry, get_rss_bytes
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Models the server loads on behalf of the workers; tokenizers stay in each worker
+SERVED_MODELS = ['easyocr', 'qg_model', 'qa_pipeline']
+
+# Seconds a worker keeps retrying while the server is still starting
+CONNECT_TIMEOUT = float(os.getenv("INFERENCE_SERVER_CONNECT_TIMEOUT", "30"))
+
+
+class RemoteInferenceError(Exception):
+    """Raised in a worker when the inference server fails a call"""
+
+
+def server_socket():
+    """Socket of the inference server the workers should use, or None to load models locally"""
+    return os.getenv("INFERENCE_SERVER_SOCKET") or None
+
+
+def key_path(address):
+    return f"{address}.key"
+
+
+def read_authkey(address):
+    """Key shared by the server at address and its clients; raises FileNotFoundError until the server wrote it"""
+    authkey = os.getenv("INFERENCE_SERVER_AUTHKEY")
+    if authkey:
+        return authkey.encode('utf-8')
+    with open(key_path(address), 'rb') as f:
+        return f.read().strip()
+
+
+def _write_authkey(address):
+    """Write a new random key next to the socket, readable by this user only, and return it"""
+    path = key_path(address)
+    if os.path.exists(path):
+        os.unlink(path)
+    authkey = secrets.token_hex(32).encode('ascii')
+    # O_EXCL so the file is ours and was never readable by anyone else
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+
+def _share(array):
+    """Copy an array into a new shared memory block; returns the block and its descriptor"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {'shm': block.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+
+def _attach(descriptor):
+    """Map a shared array in place; the caller closes the block once done with the array"""
+    block = shared_memory.SharedMemory(name=descriptor['shm'])
+    # The creating worker unlinks the block; stop this process's tracker from doing it again at exit
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block, np.ndarray(descriptor['shape'], dtype=np.dtype(descriptor['dtype']), buffer=block.buf)
+
+
+class InferenceClient:
+    """Thread-safe client; each calling thread borrows its own connection from a pool"""
+
+    def __init__(self, address, connect_timeout=CONNECT_TIMEOUT):
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                # Read on every connect: a restarted server writes a new key
+                return connection.Client(self.address, family='AF_UNIX', authkey=read_authkey(self.address))
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                if time.monotonic() >= deadline:
+                    raise RemoteInferenceError(f"Inference server not reachable at {self.address}: {str(e)}")
+                time.sleep(0.2)
+            except connection.AuthenticationError as e:
+                raise RemoteInferenceError(f"Inference server at {self.address} rejected the authkey: {str(e)}")
+
+    def call(self, method, *args, **kwargs):
+        """Run method on the server and return its result"""
+        # One retry on a fresh connection covers a restarted server
+        for attempt in range(2):
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.send((method, args, kwargs))
+                status, result = conn.recv()
+            except (EOFError, OSError) as e:
+                conn.close()
+                if attempt:
+                    raise RemoteInferenceError(f"Lost connection to inference server: {str(e)}")
+                continue
+            self._idle.put(conn)
+            if status == 'error':
+                raise RemoteInferenceError(result)
+            return result
+
+    def call_with_arrays(self, method, arrays, *args, **kwargs):
+        """Like call, with arrays passed through shared memory as the first argument"""
+        blocks = []
+        try:
+            descriptors = []
+            for array in arrays:
+                block, descriptor = _share(array)
+                blocks.append(block)
+                descriptors.append(descriptor)
+            return self.call(method, descriptors, *args, **kwargs)
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def stats(self):
+        return self.call('stats')
+
+
+class RemoteReader:
+    """Stands in for easyocr.Reader in the workers"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def readtext(self, image, **kwargs):
+        return self.client.call_with_arrays('easyocr.readtext_batched', [image], **kwargs)[0]
+
+    def readtext_batched(self, images, **kwargs):
+        return self.client.call_with_arrays('easyocr.readtext_batched', images, **kwargs)
+
+
+class RemoteSeq2SeqModel:
+    """Stands in for the question generation model; only generate() is proxied"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate(self, **kwargs):
+        import torch
+        # Token ids are small, so they are pickled rather than shared
+        inputs = {key: value.numpy() if isinstance(value, torch.Tensor) else value for key, value in kwargs.items()}
+        return torch.from_numpy(self.client.call('qg_model.generate', **inputs))
+
+
+class RemoteQAPipeline:
+    """Stands in for the question-answering pipeline"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __call__(self, **kwargs):
+        return self.client.call('qa_pipeline', **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+_PROXIES = {
+    'easyocr': RemoteReader,
+    'qg_model': RemoteSeq2SeqModel,
+    'qa_pipeline': RemoteQAPipeline,
+}
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(server_socket())
+        return _client
+
+
+def model_loader(name, local_loader):
+    """Loader to register for a served model: a server proxy if INFERENCE_SERVER_SOCKET is set"""
+    if name in _PROXIES and server_socket():
+        return lambda: _PROXIES[name](get_client())
+    return local_loader
+
+
+# Server side
+
+def _readtext_batched(descriptors, **kwargs):
+    reader = registry.get('easyocr')
+    blocks = []
+    try:
+        images = []
+        for descriptor in descriptors:
+            block, image = _attach(descriptor)
+            blocks.append(block)
+            images.append(image)
+        if len(images) == 1:
+            return [reader.readtext(images[0], **kwargs)]
+        return reader.readtext_batched(images, **kwargs)
+    finally:
+        # Drop the views before closing, otherwise the buffer is still exported
+        images = image = None
+        for block in blocks:
+            block.close()
+
+
+def _generate(**kwargs):
+    import torch
+    inputs = {key: torch.from_numpy(value) if isinstance(value, np.ndarray) else value for key, value in kwargs.items()}
+    with torch.inference_mode():
+        return registry.get('qg_model').generate(**inputs).numpy()
+
+
+def _answer(**kwargs):
+    return registry.get('qa_pipeline')(**kwargs)
+
+
+def _stats():
+    return {'pid': os.getpid(), 'rss_bytes': get_rss_bytes(), 'models': registry.stats()}
+
+
+HANDLERS = {
+    'easyocr.readtext_batched': _readtext_batched,
+    'qg_model.generate': _generate,
+    'qa_pipeline': _answer,
+    'stats': _stats,
+}
+
+
+class InferenceServer:
+    """Accepts worker connections and runs their model calls, a few at a time"""
+
+    def __init__(self, address, max_concurrency=2):
+        self.address = address
+        self.authkey = None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _authenticate(self, conn):
+        """Same handshake Listener(authkey=...) does, but on this connection's thread so a silent client blocks no one"""
+        try:
+            connection.deliver_challenge(conn, self.authkey)
+            connection.answer_challenge(conn, self.authkey)
+        except (connection.AuthenticationError, EOFError, OSError) as e:
+            logger.warning(f"Rejected an inference server connection: {str(e)}")
+            return False
+        return True
+
+    def _handle(self, conn):
+        with conn:
+            if not self._authenticate(conn):
+                return
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    handler = HANDLERS[method]
+                    if method == 'stats':
+                        reply = ('ok', handler())
+                    else:
+                        with self._slots:
+                            reply = ('ok', handler(*args, **kwargs))
+                except Exception as e:
+                    logger.error(f"Inference call {method} failed: {str(e)}")
+                    reply = ('error', f"{type(e).__name__}: {str(e)}")
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        # Socket and key file are created owner-only, with no window before a chmod
+        previous_umask = os.umask(0o177)
+        try:
+            self.authkey = read_authkey(self.address) if os.getenv("INFERENCE_SERVER_AUTHKEY") else _write_authkey(self.address)
+            listener = connection.Listener(self.address, family='AF_UNIX', backlog=64)
+        finally:
+            os.umask(previous_umask)
+        logger.info(f"Inference server listening on {self.address}")
+        try:
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), name='inference-conn', daemon=True).start()
+        finally:
+            listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', default=os.getenv("INFERENCE_SERVER_SOCKET", "/tmp/hindi-ocr-inference.sock"),
+                        help='Unix socket to listen on')
+    parser.add_argument('--max-concurrency', type=int, default=int(os.getenv("INFERENCE_SERVER_CONCURRENCY", "2")),
+                        help='model calls run at the same time; torch threads are split between them')
+    args = parser.parse_args()
+
+    # This process loads the real models, so the model modules must not register proxies
+    os.environ.pop("INFERENCE_SERVER_SOCKET", None)
+    from core.torch_runtime import configure_torch_threads
+    import ocr.hindi_ocr  # noqa: F401 - registers the EasyOCR loader
+    import qa.question_answer  # noqa: F401 - registers the QG/QA loaders
+
+    configure_torch_threads(workers=1, threads=args.max_concurrency)
+    # Listen straight away; calls that arrive during warm-up wait on the registry locks
+    threading.Thread(target=registry.warm_up, args=(SERVED_MODELS,), name='model-warmup', daemon=True).start()
+    InferenceServer(args.socket, args.max_concurrency).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.processes import process_start, same_process
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class JobManager:
+    """Runs OCR jobs on a bounded thread pool and keeps their state in a sqlite file.
+
+    The image of every pending job is kept on disk, so a job whose worker died is
+    picked up again by the next worker that starts, and any worker can report
+    the status or result of any job. Jobs are owned by a boot id generated for
+    each manager rather than by pid, since restarted workers often get the
+    pids of the ones they replace.
+    """
+
+    def __init__(self, directory, handler, max_workers=2, max_pending=32, ttl=24 * 3600):
+        self.directory = directory
+        self.handler = handler
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.db_path = os.path.join(directory, 'jobs.sqlite3')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.boot_id = uuid.uuid4().hex
+
+        os.makedirs(directory, exist_ok=True)
+        self._init_db()
+        self._register_owner()
+        self.recover()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, owner INTEGER NOT NULL, boot_id TEXT NOT NULL, '
+                'image_path TEXT, result TEXT, error TEXT, '
+                'created REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS owners ('
+                'boot_id TEXT PRIMARY KEY, pid INTEGER NOT NULL, process_start TEXT, started REAL NOT NULL)'
+            )
+        conn.close()
+
+    def _register_owner(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO owners (boot_id, pid, process_start, started) VALUES (?, ?, ?, ?)',
+                (self.boot_id, os.getpid(), process_start(os.getpid()), time.time())
+            )
+        conn.close()
+
+    def _owner_alive(self, conn, boot_id):
+        """Whether the manager that owns a job is still running"""
+        if boot_id == self.boot_id:
+            return True
+        owner = conn.execute('SELECT pid, process_start FROM owners WHERE boot_id = ?', (boot_id,)).fetchone()
+        # Same pid, different process start: the owner was replaced by a restart
+        return owner is not None and same_process(owner['pid'], owner['process_start'])
+
+    def _image_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.img")
+
+    def submit(self, image_bytes):
+        """Persist a new job and queue it; returns the job id"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Too many OCR jobs are waiting; try again later")
+            self._pending += 1
+
+        try:
+            job_id = uuid.uuid4().hex
+            image_path = self._image_path(job_id)
+            with open(image_path, 'wb') as f:
+                f.write(image_bytes)
+
+            now = time.time()
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT INTO jobs (id, status, owner, boot_id, image_path, created, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, QUEUED, os.getpid(), self.boot_id, image_path, now, now)
+                )
+                self._purge_expired(conn, now)
+            conn.close()
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        self._executor.submit(self._run, job_id)
+        logger.info(f"Queued OCR job {job_id}")
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist"""
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'status': row['status'],
+            'created': row['created'],
+            'updated': row['updated']
+        }
+        if row['result'] is not None:
+            job['result'] = json.loads(row['result'])
+        if row['error'] is not None:
+            job['error'] = row['error']
+        return job
+
+    def _set_status(self, job_id, status, expected, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        with conn:
+            updated = conn.execute(
+                f"UPDATE jobs SET status = ?, updated = ?{', ' + columns if columns else ''} "
+                'WHERE id = ? AND status = ? AND boot_id = ?',
+                (status, time.time(), *fields.values(), job_id, expected, self.boot_id)
+            ).rowcount
+        conn.close()
+        return updated == 1
+
+    def _run(self, job_id):
+        try:
+            if not self._set_status(job_id, RUNNING, QUEUED):
+                return
+
+            logger.info(f"Running OCR job {job_id}")
+            start_time = time.time()
+            image_path = self._image_path(job_id)
+            try:
+                with open(image_path, 'rb') as f:
+                    result = self.handler(f.read())
+            except Exception as e:
+                logger.error(f"OCR job {job_id} failed: {str(e)}", exc_info=True)
+                self._set_status(job_id, FAILED, RUNNING, error=str(e))
+            else:
+                self._set_status(job_id, DONE, RUNNING, result=json.dumps(result, ensure_ascii=False))
+                logger.info(f"OCR job {job_id} completed in {time.time() - start_time:.2f} seconds")
+
+            if os.path.exists(image_path):
+                os.remove(image_path)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def recover(self):
+        """Take over queued or running jobs whose owning manager has exited"""
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT id, owner, boot_id, status FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+        ).fetchall()
+        orphaned = [row for row in rows if not self._owner_alive(conn, row['boot_id'])]
+        conn.close()
+
+        for row in orphaned:
+            image_missing = not os.path.exists(self._image_path(row['id']))
+            conn = self._connect()
+            with conn:
+                # Only one restarting worker wins the claim for a given job
+                claimed = conn.execute(
+                    'UPDATE jobs SET status = ?, owner = ?, boot_id = ?, updated = ?, error = ? '
+                    'WHERE id = ? AND boot_id = ? AND status = ?',
+                    (FAILED if image_missing else QUEUED, os.getpid(), self.boot_id, time.time(),
+                     'Job image was lost when its worker exited' if image_missing else None,
+                     row['id'], row['boot_id'], row['status'])
+                ).rowcount
+            conn.close()
+            if not claimed:
+                continue
+            if image_missing:
+                # Failed jobs expire with the others instead of staying queued forever
+                logger.warning(f"OCR job {row['id']} from exited worker {row['owner']} has no image; marked failed")
+                continue
+            logger.info(f"Recovered OCR job {row['id']} from exited worker {row['owner']}")
+            with self._lock:
+                self._pending += 1
+            self._executor.submit(self._run, row['id'])
+
+        conn = self._connect()
+        with conn:
+            # Forget managers that have exited and own no unfinished jobs
+            for owner in conn.execute('SELECT boot_id FROM owners').fetchall():
+                if self._owner_alive(conn, owner['boot_id']):
+                    continue
+                conn.execute(
+                    'DELETE FROM owners WHERE boot_id = ? AND NOT EXISTS '
+                    '(SELECT 1 FROM jobs WHERE boot_id = ? AND status IN (?, ?))',
+                    (owner['boot_id'], owner['boot_id'], QUEUED, RUNNING)
+                )
+        conn.close()
+
+    def _purge_expired(self, conn, now):
+        conn.execute(
+            'DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?',
+            (DONE, FAILED, now - self.ttl)
+        )
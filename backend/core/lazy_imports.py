@@ -0,0 +1,23 @@
+import sys
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module and imports it on first attribute access"""
+
+    def __getattr__(self, attr):
+        module = self.__dict__.get('_module')
+        if module is None:
+            module = self.__dict__['_module'] = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """Return the module if it is already imported, otherwise a LazyModule for it"""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def imported_modules(names):
+    """Which of the given modules have actually been imported in this process"""
+    return {name: name in sys.modules for name in names}
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+from core.processes import process_start, same_process
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; see SnapshotExporter._retire
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PREFIX = 'hindi_ocr_'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+DESCRIPTIONS = {
+    'stage_duration_seconds': 'Time spent in each pipeline stage',
+    'ocr_engine_wins_total': 'Requests whose text came from each OCR engine',
+    'ocr_outcomes_total': 'OCR results by outcome (text, no_text, all_zeros, error)',
+    'answer_source_total': 'Extracted answers by source (model, or rule_based as a fallback or a confident skip of the model)',
+    'requests_total': 'API requests by endpoint',
+    'qa_sentences_total': 'Sentences by outcome (generated, cache_hit, near_duplicate)',
+    'qa_model_calls_avoided_total': 'Question generation and answer extraction calls skipped, by reason',
+    'qa_budget_outcomes_total': 'Latency-budgeted QA runs that met the budget, downgraded decoding or stopped early',
+}
+
+
+class Metrics:
+    """In-process counters and latency histograms
+
+    Recording is a dict update under a lock; nothing is formatted until
+    something scrapes /api/metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._dirty = False
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._dirty = True
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+            self._dirty = True
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Time the enclosed block into stage_duration_seconds{stage=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def snapshot(self):
+        """JSON-serializable copy of every metric"""
+        with self._lock:
+            self._dirty = False
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, dict(labels), dict(h, buckets=list(h['buckets']))]
+                    for (name, labels), h in self._histograms.items()
+                ]
+            }
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+
+def merge_snapshots(snapshots):
+    """Sum counters and histograms from several processes"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, h in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0})
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], h['buckets'])]
+            merged['sum'] += h['sum']
+            merged['count'] += h['count']
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render_prometheus(snapshots):
+    """Render merged snapshots in the Prometheus text exposition format"""
+    counters, histograms = merge_snapshots(snapshots)
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name, 'counter')
+        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), h in sorted(histograms.items()):
+        describe(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, h['buckets']):
+            cumulative += count
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {h['count']}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {h['sum']}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {h['count']}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def _as_snapshot(counters, histograms):
+    """Turn merge_snapshots output back into a snapshot"""
+    return {
+        'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), h] for (name, labels), h in histograms.items()]
+    }
+
+
+class SnapshotExporter:
+    """Shares each worker's metrics through files so any worker can answer a scrape
+
+    Every process writes its snapshot to <directory>/<id>.json, at most every
+    interval seconds and only when something changed. The id is a uuid drawn
+    once per process, so a restarted worker that reuses a pid never
+    overwrites the counts of the one before it. A scrape flushes the local
+    snapshot and merges all the files; files of exited processes are first
+    folded into retired.json, so counters never go backwards and the
+    directory holds one file per live process.
+    """
+
+    RETIRED = 'retired.json'
+
+    def __init__(self, metrics, directory, interval=10):
+        self.metrics = metrics
+        self.directory = directory
+        self.interval = interval
+        self._owner = None
+        self._file_pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self):
+        """This process's snapshot file, named afresh in each (forked) process"""
+        if self._file_pid != os.getpid():
+            self._file_pid = os.getpid()
+            self._process = {'pid': self._file_pid, 'process_start': process_start(self._file_pid)}
+            self._file_name = f"{uuid.uuid4().hex}.json"
+        return os.path.join(self.directory, self._file_name)
+
+    @staticmethod
+    def _write(path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def flush(self):
+        path = self._path()
+        self._write(path, dict(self._process, snapshot=self.metrics.snapshot()))
+
+    def start(self):
+        # Started lazily (and per process) so forked gunicorn workers each get a flusher
+        with self._lock:
+            if self._owner == os.getpid():
+                return
+            self._owner = os.getpid()
+            threading.Thread(target=self._loop, name='metrics-flush', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            if self.metrics.dirty:
+                try:
+                    self.flush()
+                except OSError as e:
+                    logger.error(f"Failed to write metrics snapshot: {str(e)}")
+
+    def _retire(self, names):
+        """Fold the snapshots of exited processes into retired.json and delete their files
+
+        Runs under an exclusive lock so two scrapes never count a file twice
+        (without flock, on Windows, two scrapes at the same moment can).
+        retired.json lists the files it already holds until they are gone,
+        so a crash between writing it and deleting a file loses nothing and
+        counts nothing twice.
+        """
+        retired_path = os.path.join(self.directory, self.RETIRED)
+        with open(os.path.join(self.directory, 'retire.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = self._read(retired_path) or {'snapshot': {'counters': [], 'histograms': []}, 'files': []}
+            folded = [name for name in retired['files'] if os.path.exists(os.path.join(self.directory, name))]
+            snapshots = [retired['snapshot']]
+            for name in names:
+                if name in folded:
+                    continue
+                data = self._read(os.path.join(self.directory, name))
+                if data is None:
+                    continue
+                snapshots.append(data['snapshot'])
+                folded.append(name)
+            self._write(retired_path, {'snapshot': _as_snapshot(*merge_snapshots(snapshots)), 'files': folded})
+            for name in folded:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self):
+        """Return the snapshots of this process and every other worker, exited ones merged into one"""
+        self.flush()
+        own = os.path.basename(self._path())
+        snapshots, exited = [], {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == self.RETIRED:
+                continue
+            data = self._read(os.path.join(self.directory, name))
+            if data is None:
+                continue
+            if name == own or same_process(data['pid'], data['process_start']):
+                snapshots.append(data['snapshot'])
+            else:
+                exited[name] = data['snapshot']
+
+        if exited:
+            try:
+                self._retire(list(exited))
+            except OSError as e:
+                logger.error(f"Failed to merge metrics of exited workers: {str(e)}")
+        retired = self._read(os.path.join(self.directory, self.RETIRED))
+        held = set()
+        if retired is not None:
+            snapshots.append(retired['snapshot'])
+            held = set(retired['files'])
+        # Files left behind by a failed merge still count, once
+        snapshots.extend(snapshot for name, snapshot in exited.items()
+                         if name not in held and os.path.exists(os.path.join(self.directory, name)))
+        return snapshots
+
+
+# Shared instance used by the OCR, QA and API modules
+metrics = Metrics()
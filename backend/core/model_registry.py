@@ -0,0 +1,192 @@
+import os
+import sys
+import logging
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Set MODEL_WARMUP=0 to load models on first use instead of in the background at startup
+WARMUP_ENABLED = os.getenv("MODEL_WARMUP", "1") != "0"
+
+
+def get_rss_bytes():
+    """Return the resident set size of the current process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Not on Linux - fall back to peak RSS, which is the best we can do
+        try:
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+            return usage if sys.platform == 'darwin' else usage * 1024
+        except Exception:
+            return 0
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each model once and shares it between threads"""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._warmers = {}
+        self._lock = threading.Lock()
+        self._warm_up_owner = None
+        self._warm_up_done = threading.Event()
+        self._has_fallback = set()
+        self._retry = None
+
+    def register(self, name, loader, warmup=None, has_fallback=False):
+        """Register a zero-argument loader under the given name
+
+        warmup, if given, is called with the loaded model during warm_up() to
+        run a dummy inference, so the first real request doesn't pay for
+        lazy initialization inside the model. has_fallback marks a model the
+        app can do without (EasyOCR, which Tesseract stands in for); any other
+        model that fails to load makes the process unready.
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            self._warmers[name] = warmup
+            if has_fallback:
+                self._has_fallback.add(name)
+            else:
+                self._has_fallback.discard(name)
+            self._locks.setdefault(name, threading.Lock())
+            self._stats.setdefault(name, {'state': 'registered', 'load_time': None,
+                                          'memory_bytes': None, 'error': None,
+                                          'warmup_time': None})
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """Return the model registered under name, loading it on first use"""
+        # Fast path - no locking once the model is in place
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'")
+            model_lock = self._locks[name]
+
+        # Only one thread loads a given model; others wait for it here
+        with model_lock:
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading model '{name}'")
+            self._stats[name]['state'] = 'loading'
+            rss_before = get_rss_bytes()
+            start_time = time.time()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                # Leave the slot empty so a later call can retry the load
+                self._stats[name].update(state='failed', error=str(e))
+                logger.error(f"Failed to load model '{name}': {str(e)}")
+                raise
+
+            load_time = time.time() - start_time
+            self._stats[name].update(
+                state='loaded',
+                load_time=load_time,
+                memory_bytes=max(get_rss_bytes() - rss_before, 0),
+                error=None
+            )
+            self._models[name] = model
+            logger.info(f"Model '{name}' loaded in {load_time:.2f} seconds")
+            return model
+
+    def warm_up(self, names=None):
+        """Load the given models (all registered models by default) and run their warm-up calls, logging failures"""
+        with self._lock:
+            names = list(names or self._loaders)
+        for name in names:
+            try:
+                model = self.get(name)
+            except Exception:
+                # Already logged by get(); keep warming the remaining models
+                continue
+
+            warmer = self._warmers.get(name)
+            if warmer is None or self._stats[name]['warmup_time'] is not None:
+                continue
+            start_time = time.time()
+            try:
+                warmer(model)
+            except Exception as e:
+                # The model is loaded; a failed dummy call only means the first request is slower
+                logger.warning(f"Warm-up inference for '{name}' failed: {str(e)}")
+                continue
+            self._stats[name]['warmup_time'] = time.time() - start_time
+            logger.info(f"Model '{name}' warmed up in {self._stats[name]['warmup_time']:.2f} seconds")
+
+    def start_warm_up(self):
+        """Run warm_up() on a background thread, once per process"""
+        if not WARMUP_ENABLED:
+            return
+        with self._lock:
+            # Forked workers inherit the parent's registry; each process warms its own models
+            if self._warm_up_owner == os.getpid():
+                return
+            self._warm_up_owner = os.getpid()
+            self._warm_up_done = threading.Event()
+            done = self._warm_up_done
+
+        def run():
+            try:
+                self.warm_up()
+            finally:
+                done.set()
+
+        threading.Thread(target=run, name='model-warmup', daemon=True).start()
+
+    def _retry_in_background(self, names):
+        """Load the given models again on a background thread, unless a retry is still running"""
+        with self._lock:
+            if self._retry is not None and self._retry.is_alive():
+                return
+            self._retry = threading.Thread(target=self.warm_up, args=(names,), name='model-retry', daemon=True)
+            self._retry.start()
+
+    def readiness(self):
+        """Return (ready, per-model stats)
+
+        Ready means warm-up has finished, no model is still loading and every
+        model without a fallback is loaded. A failed model with a fallback is
+        reported but doesn't block readiness. Failed models are loaded again
+        in the background on each check, since an unready worker gets no
+        requests that would retry them.
+        """
+        models = self.stats()
+        with self._lock:
+            missing = [name for name, stats in models.items()
+                       if stats['state'] == 'failed' and name not in self._has_fallback]
+        if missing:
+            self._retry_in_background(missing)
+        if not WARMUP_ENABLED:
+            return not missing, models
+        ready = (self._warm_up_done.is_set() and not missing and
+                 all(stats['state'] != 'loading' for stats in models.values()))
+        return ready, models
+
+    def stats(self):
+        """Return load state, load time and memory delta for every registered model"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+# Shared instance used by the OCR and QA modules
+registry = ModelRegistry()
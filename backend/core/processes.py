@@ -0,0 +1,36 @@
+import os
+
+
+def process_start(pid):
+    """Kernel boot id plus the process start time, or None where /proc is unavailable
+
+    Together with the pid this names one process: a pid reused after a
+    restart belongs to a process with a different start time.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            kernel_boot = f.read().strip()
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesized command name; starttime is the 22nd field overall
+            start_ticks = f.read().rsplit(')', 1)[1].split()[19]
+        return f"{kernel_boot}:{start_ticks}"
+    except (OSError, IndexError):
+        return None
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def same_process(pid, start):
+    """Whether the process that recorded pid and start (from process_start) is still running"""
+    if not pid_alive(pid):
+        return False
+    # Without /proc only the pid can be checked
+    return start is None or process_start(pid) == start
@@ -0,0 +1,140 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def cache_key(image_bytes, config):
+    """Hash the uploaded image bytes together with the pipeline configuration"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier result cache: a per-process LRU in front of a sqlite file shared by all workers"""
+
+    def __init__(self, path, max_memory_entries=128, max_disk_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0,
+                          'memory_evictions': 0, 'disk_evictions': 0}
+        self._init_db()
+
+    def _connect(self):
+        # One short-lived connection per operation keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        conn.close()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        try:
+            conn = self._connect()
+            with conn:
+                row = conn.execute(
+                    'SELECT value, created FROM results WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Result cache read failed: {str(e)}")
+            row = None
+
+        if row is None or now - row[1] > self.ttl:
+            self._count('misses')
+            return None
+
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self._count('disk_hits')
+        return value
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key in both tiers"""
+        now = time.time()
+        self._remember(key, now, value)
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._evict_disk(conn, now)
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Result cache write failed: {str(e)}")
+        self._count('stores')
+
+    def _remember(self, key, created, value):
+        with self._lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self._counters['memory_evictions'] += 1
+
+    def _evict_disk(self, conn, now):
+        expired = conn.execute('DELETE FROM results WHERE created < ?', (now - self.ttl,)).rowcount
+        overflow = conn.execute(
+            'DELETE FROM results WHERE key IN ('
+            'SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,)
+        ).rowcount
+        if expired or overflow:
+            self._count('disk_evictions', expired + overflow)
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+        try:
+            conn = self._connect()
+            stats['disk_entries'] = conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            conn.close()
+        except sqlite3.Error:
+            stats['disk_entries'] = None
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
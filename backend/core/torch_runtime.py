@@ -0,0 +1,53 @@
+import os
+import logging
+
+from core.lazy_imports import lazy_import
+
+torch = lazy_import('torch')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 'fp32' loads the transformer models as published; 'int8' applies dynamic quantization to their Linear layers
+INFERENCE_PRECISION = os.getenv("INFERENCE_PRECISION", "fp32")
+
+
+def cpu_thread_budget(workers, threads, cpu_count=None):
+    """Split the machine's cores between every concurrent request thread
+
+    Each request thread that calls into torch gets its own OpenMP team, so
+    the per-call budget is cores / (workers * threads), at least one.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, workers * threads))
+
+
+def configure_torch_threads(workers=1, threads=1):
+    """Set torch intra-/inter-op thread counts for this process
+
+    TORCH_INTRA_OP_THREADS and TORCH_INTER_OP_THREADS override the computed
+    defaults.
+    """
+    intra_op = int(os.getenv("TORCH_INTRA_OP_THREADS", str(cpu_thread_budget(workers, threads))))
+    inter_op = int(os.getenv("TORCH_INTER_OP_THREADS", "1"))
+
+    torch.set_num_threads(intra_op)
+    try:
+        torch.set_num_interop_threads(inter_op)
+    except RuntimeError:
+        # Can only be set before the first inter-op parallel work in the process
+        logger.warning("torch inter-op threads already initialized; leaving them as they are")
+    logger.info(f"torch using {torch.get_num_threads()} intra-op and {torch.get_num_interop_threads()} inter-op threads")
+
+
+def prepare_for_cpu_inference(model, precision=None):
+    """Put a model in eval mode and apply the given precision (INFERENCE_PRECISION by default)"""
+    precision = precision or INFERENCE_PRECISION
+    model.eval()
+    if precision == 'int8':
+        logger.info(f"Quantizing {type(model).__name__} to dynamic int8")
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif precision != 'fp32':
+        raise ValueError(f"Unsupported inference precision '{precision}' (use fp32 or int8)")
+    return model
@@ -1,4 +1,52 @@
+import os
+import sys
+import secrets
+import threading
+import subprocess
+
 bind = "0.0.0.0:10000"
-workers = 4
-threads = 4
-timeout = 120
\ No newline at end of file
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = 120
+
+# Lets each worker size its OCR page pool to its share of the cores
+os.environ.setdefault("GUNICORN_WORKERS", str(workers))
+
+# OpenMP reads this when torch is first imported in a worker; keep every
+# request thread to its share of the cores instead of all of them
+os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // (workers * threads))))
+
+# With INFERENCE_SERVER_SOCKET set, the workers use one shared inference
+# server for the models; start it with the arbiter unless it is run separately
+_inference_server = None
+
+def on_starting(server):
+    global _inference_server
+    socket_path = os.getenv("INFERENCE_SERVER_SOCKET")
+    if not socket_path or os.getenv("INFERENCE_SERVER_SPAWN", "1") == "0":
+        return
+    # The server and the workers (forked from this process) share a fresh key
+    os.environ.setdefault("INFERENCE_SERVER_AUTHKEY", secrets.token_hex(32))
+    _inference_server = subprocess.Popen(
+        [sys.executable, "-m", "core.inference_server", "--socket", socket_path],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    server.log.info(f"Started inference server (pid {_inference_server.pid}) on {socket_path}")
+
+def on_exit(server):
+    if _inference_server is not None:
+        _inference_server.terminate()
+        _inference_server.wait(timeout=30)
+
+def post_worker_init(worker):
+    # Importing torch takes seconds, so the thread budget is applied off the
+    # worker's main thread, followed by the model warm-up; /api/ready reports
+    # when it has finished
+    from core.model_registry import registry
+    from core.torch_runtime import configure_torch_threads
+
+    def prepare():
+        configure_torch_threads(workers, threads)
+        registry.start_warm_up()
+
+    threading.Thread(target=prepare, name="worker-prepare", daemon=True).start()
@@ -0,0 +1,117 @@
+import io
+import os
+import logging
+import warnings
+
+import numpy as np
+from PIL import Image
+
+from core.lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Images are scaled so their longer side is at most this many pixels (0 keeps full resolution).
+# EasyOCR's CRAFT detector works on a 2560px canvas, so more resolution only costs time.
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2560"))
+
+# Uploads with more pixels than this are rejected before decoding (decompression bomb guard)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(60_000_000)))
+
+# cv2 flags that let the decoder itself reduce the resolution (DCT scaling for JPEG)
+_REDUCED_FLAGS = [(8, 'IMREAD_REDUCED_COLOR_8'), (4, 'IMREAD_REDUCED_COLOR_4'), (2, 'IMREAD_REDUCED_COLOR_2')]
+
+
+class ImageTooLarge(ValueError):
+    """Raised for images whose pixel count exceeds MAX_IMAGE_PIXELS"""
+
+
+def read_image_size(source):
+    """Return (width, height) from the header of encoded bytes or a binary file, or None if unknown
+
+    Only the header is parsed; the pixel data is never decoded.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        with warnings.catch_warnings():
+            # The pixel budget is enforced by check_pixel_budget, not by PIL's warning
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                return image.size
+    except Image.DecompressionBombError as e:
+        # Far beyond PIL's own limit, and so beyond any sensible budget
+        raise ImageTooLarge(str(e))
+    except Exception:
+        return None
+
+
+def check_pixel_budget(width, height, max_pixels=MAX_IMAGE_PIXELS):
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLarge(
+            f"Image is too large ({width}x{height} pixels); the limit is {max_pixels / 1e6:.0f} megapixels"
+        )
+
+
+def _reduction_factor(long_side, max_side):
+    """Largest decoder reduction that keeps the long side at or above max_side"""
+    if not max_side:
+        return 1
+    for factor, _ in _REDUCED_FLAGS:
+        if long_side // factor >= max_side:
+            return factor
+    return 1
+
+
+def decode_image(image_data, max_side=OCR_MAX_SIDE, max_pixels=MAX_IMAGE_PIXELS):
+    """Decode encoded image bytes to a BGR array no larger than max_side on its longer side
+
+    Returns (image, info) where info holds the original and decoded sizes and
+    the scale factor (decoded / original), so coordinates found in the
+    decoded image can be mapped back by dividing by it. image is None if the
+    data can't be decoded. Raises ImageTooLarge before decoding anything when
+    the header reports more than max_pixels.
+    """
+    size = read_image_size(image_data)
+    if size is not None:
+        check_pixel_budget(*size, max_pixels)
+
+    buffer = np.frombuffer(image_data, np.uint8)
+    factor = _reduction_factor(max(size), max_side) if size is not None else 1
+    flag = cv2.IMREAD_COLOR
+    if factor > 1:
+        flag = getattr(cv2, dict(_REDUCED_FLAGS)[factor])
+    image = cv2.imdecode(buffer, flag)
+    if image is None:
+        return None, None
+
+    decoded_height, decoded_width = image.shape[:2]
+    if size is None:
+        # Header unreadable by PIL; the budget can only be checked after decoding
+        size = (decoded_width, decoded_height)
+        check_pixel_budget(*size, max_pixels)
+
+    long_side = max(decoded_width, decoded_height)
+    if max_side and long_side > max_side:
+        resize = max_side / long_side
+        image = cv2.resize(
+            image,
+            (max(1, round(decoded_width * resize)), max(1, round(decoded_height * resize))),
+            interpolation=cv2.INTER_AREA
+        )
+
+    height, width = image.shape[:2]
+    # Compare long sides: EXIF orientation may have swapped width and height
+    scale = max(width, height) / max(size)
+    info = {
+        'original_size': list(size),
+        'decoded_size': [width, height],
+        'scale': round(scale, 6),
+        'decoder_reduction': factor
+    }
+    if scale != 1:
+        logger.info(f"Decoded {size[0]}x{size[1]} image at {width}x{height} (scale {scale:.3f})")
+    return image, info
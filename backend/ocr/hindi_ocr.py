@@ -2,38 +2,81 @@ import os
 import sys
 import logging
 import numpy as np
-import cv2
 from PIL import Image
-import pytesseract
-import torch
-import easyocr
 import time
+import shlex
+import functools
+import signal
 import tempfile
+import threading
 import subprocess
 from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.model_registry import registry
+from core.batching import BATCHING_ENABLED, get_batcher
+from core.metrics import metrics
+from core.inference_server import model_loader
+from core.lazy_imports import lazy_import
+from ocr.decode import decode_image, ImageTooLarge
+
+# Heavy modules are imported on first use so importing the app stays fast
+cv2 = lazy_import('cv2')
+torch = lazy_import('torch')
+easyocr = lazy_import('easyocr')
+pytesseract = lazy_import('pytesseract')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize EasyOCR reader (only once)
-reader = None
+# 'sequential' runs EasyOCR then falls back to Tesseract; 'race' runs both at once
+OCR_MODE = os.getenv("OCR_MODE", "sequential")
+# In race mode, 'priority' prefers engines in OCR_ENGINE_PRIORITY order, 'first' takes whichever is accepted first
+OCR_RACE_POLICY = os.getenv("OCR_RACE_POLICY", "priority")
+OCR_ENGINE_PRIORITY = ['easyocr', 'tesseract']
 
-def get_easyocr_reader():
+# Shared threads for race mode; two per concurrent request
+_race_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("OCR_RACE_THREADS", "8")),
+    thread_name_prefix='ocr-race'
+)
+
+# 'parallel' runs every PSM at once and keeps the most confident result; 'sequential' tries them in order
+TESSERACT_STRATEGY = os.getenv("TESSERACT_STRATEGY", "parallel")
+TESSERACT_PSM_MODES = [6, 4, 3, 11]
+
+_tesseract_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TESSERACT_PSM_THREADS", "4")),
+    thread_name_prefix='tesseract-psm'
+)
+
+_engine_wins = {}
+_engine_wins_lock = threading.Lock()
+
+def _load_easyocr_reader():
     """Initialize EasyOCR reader with Hindi language"""
-    global reader
-    if reader is None:
-        try:
-            logger.info("Initializing EasyOCR with Hindi language support")
-            reader = easyocr.Reader(['hi', 'en'], gpu=torch.cuda.is_available())
-            logger.info("EasyOCR initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize EasyOCR: {str(e)}")
-            reader = None
+    logger.info("Initializing EasyOCR with Hindi language support")
+    reader = easyocr.Reader(['hi', 'en'], gpu=torch.cuda.is_available())
+    logger.info("EasyOCR initialized successfully")
     return reader
 
+
+def get_easyocr_reader():
+    """Return the shared EasyOCR reader, or None if it could not be initialized"""
+    try:
+        return registry.get('easyocr')
+    except Exception as e:
+        logger.error(f"Failed to initialize EasyOCR: {str(e)}")
+        return None
+
+@functools.lru_cache(maxsize=1)
 def check_tesseract_hindi():
-    """Check if Tesseract has Hindi language support"""
+    """Check if Tesseract has Hindi language support
+
+    The result is memoized: installed language data doesn't change while the process runs.
+    """
     try:
         # Check for Hindi language data in common locations
         hindi_data_paths = [
@@ -64,56 +107,159 @@ def check_tesseract_hindi():
         logger.error(f"Error checking Tesseract Hindi support: {str(e)}")
         return False
 
-def enhance_image_for_hindi_ocr(image):
-    """Apply special enhancements for Hindi text recognition"""
-    try:
-        # Convert to numpy array if PIL image
-        if isinstance(image, Image.Image):
-            image_np = np.array(image)
-        else:
-            image_np = image.copy()
-        
+class ImageVariants:
+    """Preprocessed versions of an image, each computed on first access
+
+    Behaves like the dict enhance_image_for_hindi_ocr used to return, but a
+    variant (and whatever it is derived from) is only built when an OCR engine
+    asks for it. Intermediate steps that nobody asked for are not kept.
+    """
+
+    NAMES = ('original', 'grayscale', 'threshold', 'enhanced', 'color_enhanced', 'pil_enhanced')
+
+    def __init__(self, image_np):
+        self._cache = {'original': image_np}
+        # Race mode may read variants from two engine threads at once
+        self._lock = threading.Lock()
+        self._builders = {
+            'grayscale': self._build_grayscale,
+            'threshold': self._build_threshold,
+            'enhanced': self._build_enhanced,
+            'color_enhanced': self._build_color_enhanced,
+            'pil_enhanced': self._build_pil_enhanced
+        }
+
+    def _variant(self, name, keep):
+        if name in self._cache:
+            return self._cache[name]
+        value = self._builders[name]()
+        if keep:
+            self._cache[name] = value
+        return value
+
+    def _build_grayscale(self):
+        image_np = self._cache['original']
         # Convert to grayscale if color
         if len(image_np.shape) == 3:
-            gray = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = image_np.copy()
-        
+            return cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+        return image_np
+
+    def _build_threshold(self):
         # Noise removal and smoothing
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        blurred = cv2.GaussianBlur(self._variant('grayscale', keep=False), (5, 5), 0)
         
         # Apply adaptive thresholding - better for varying lighting conditions
         # For Hindi text, we want to preserve thin connecting lines between characters
+        # (written into the blur buffer, which is not needed afterwards)
         thresh = cv2.adaptiveThreshold(
             blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 11, 2
+            cv2.THRESH_BINARY, 11, 2, dst=blurred
         )
         
         # Invert if needed (white text on black background)
         if np.mean(thresh) < 127:
-            thresh = cv2.bitwise_not(thresh)
-        
+            cv2.bitwise_not(thresh, dst=thresh)
+        return thresh
+
+    def _build_enhanced(self):
         # Dilate to make text more prominent
         kernel = np.ones((2, 2), np.uint8)
-        dilated = cv2.dilate(thresh, kernel, iterations=1)
-        
+        return cv2.dilate(self._variant('threshold', keep=False), kernel, iterations=1)
+
+    def _build_color_enhanced(self):
         # Create enhanced color version for neural models
-        enhanced_color = cv2.cvtColor(dilated, cv2.COLOR_GRAY2RGB)
-        
-        # Return multiple versions for different OCR methods
-        return {
-            'original': image_np,
-            'grayscale': gray, 
-            'threshold': thresh,
-            'enhanced': dilated,
-            'color_enhanced': enhanced_color,
-            'pil_enhanced': Image.fromarray(dilated)
-        }
-    except Exception as e:
-        logger.error(f"Error enhancing image: {str(e)}")
-        if isinstance(image, Image.Image):
-            return {'original': np.array(image), 'pil_enhanced': image}
-        return {'original': image, 'pil_enhanced': Image.fromarray(image)}
+        return cv2.cvtColor(self._variant('enhanced', keep=False), cv2.COLOR_GRAY2RGB)
+
+    def _build_pil_enhanced(self):
+        return Image.fromarray(self._variant('enhanced', keep=False))
+
+    def __getitem__(self, name):
+        if name not in self.NAMES:
+            raise KeyError(name)
+        # Built variants are read without the lock, so one engine reading the
+        # original never waits for the other building a variant
+        value = self._cache.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            if name in self._cache:
+                return self._cache[name]
+            with metrics.span('preprocess', variant=name):
+                return self._variant(name, keep=True)
+
+    def __contains__(self, name):
+        return name in self.NAMES
+
+    def keys(self):
+        return list(self.NAMES)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+        except Exception as e:
+            logger.error(f"Error enhancing image: {str(e)}")
+            return default
+
+    @property
+    def materialized(self):
+        """Names of the variants that have been built and kept so far"""
+        return [name for name in self.NAMES if name in self._cache]
+
+def enhance_image_for_hindi_ocr(image):
+    """Apply special enhancements for Hindi text recognition"""
+    # Convert to numpy array if PIL image
+    if isinstance(image, Image.Image):
+        image = np.array(image)
+    # Variants are derived from the original on demand and never modify it,
+    # so the decoded buffer is shared rather than copied
+    return ImageVariants(image)
+
+# EasyOCR settings optimized for Hindi
+EASYOCR_READTEXT_ARGS = dict(
+    detail=0,  # Just get the text
+    paragraph=True, 
+    decoder='greedy',
+    beamWidth=5,
+    batch_size=1,
+    contrast_ths=0.1, 
+    adjust_contrast=0.5,
+    text_threshold=0.7,
+    link_threshold=0.4,
+    add_margin=0.1,
+)
+
+def _warm_up_easyocr(reader):
+    """Run EasyOCR once over a blank strip so detector and recognizer are initialized"""
+    reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8), **EASYOCR_READTEXT_ARGS)
+
+# The EasyOCR reader is loaded once per process through the shared registry,
+# or lives in the inference server when INFERENCE_SERVER_SOCKET is set. Tesseract
+# stands in if it fails to load, so a failure doesn't make the worker unready
+registry.register('easyocr', model_loader('easyocr', _load_easyocr_reader), warmup=_warm_up_easyocr,
+                  has_fallback=True)
+
+def _readtext_batch(images):
+    """Run EasyOCR over images queued by concurrent requests
+
+    readtext_batched needs images of one size, so images are grouped by shape;
+    a group of one goes through the regular readtext call.
+    """
+    reader = registry.get('easyocr')
+    groups = {}
+    for index, image in enumerate(images):
+        groups.setdefault(image.shape, []).append(index)
+    
+    results = [None] * len(images)
+    for indices in groups.values():
+        if len(indices) == 1:
+            results[indices[0]] = reader.readtext(images[indices[0]], **EASYOCR_READTEXT_ARGS)
+            continue
+        batch_results = reader.readtext_batched([images[i] for i in indices], **EASYOCR_READTEXT_ARGS)
+        for i, result in zip(indices, batch_results):
+            results[i] = result
+    return results
 
 def use_easyocr(image_dict):
     """Use EasyOCR specialized for Hindi text"""
@@ -131,20 +277,12 @@ def use_easyocr(image_dict):
         if original_image is None:
             return None
         
-        # EasyOCR settings optimized for Hindi
-        results = reader.readtext(
-            original_image,
-            detail=0,  # Just get the text
-            paragraph=True, 
-            decoder='greedy',
-            beamWidth=5,
-            batch_size=1,
-            contrast_ths=0.1, 
-            adjust_contrast=0.5,
-            text_threshold=0.7,
-            link_threshold=0.4,
-            add_margin=0.1,
-        )
+        with metrics.span('ocr_engine', engine='easyocr'):
+            if BATCHING_ENABLED:
+                # Share a forward pass with concurrent requests for same-sized images
+                results = get_batcher('easyocr', _readtext_batch).submit(original_image)
+            else:
+                results = reader.readtext(original_image, **EASYOCR_READTEXT_ARGS)
         
         text = '\n'.join(results)
         logger.info(f"EasyOCR completed in {time.time() - start_time:.2f} seconds")
@@ -160,7 +298,149 @@ def use_easyocr(image_dict):
         logger.error(f"Error using EasyOCR: {str(e)}")
         return None
 
-def use_tesseract_for_hindi(image_dict):
+class OCRCancelled(Exception):
+    """Raised inside an OCR engine when another engine has already won the race"""
+
+@contextmanager
+def tesseract_input(image):
+    """Write an image to a temporary PNG and yield its path
+
+    Encode once per request and hand the path to every Tesseract run on that image.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = os.path.join(tmp_dir, 'page.png')
+        cv2.imwrite(image_path, image)
+        yield image_path
+
+def _run_tesseract(image_path, args, cancel_event=None, env=None):
+    """Run the Tesseract binary on an image file and return its stdout
+
+    The process is killed as soon as cancel_event gets set.
+    """
+    # Run the binary directly so we hold the process handle and can kill it
+    process = subprocess.Popen(
+        [pytesseract.pytesseract.tesseract_cmd, image_path, 'stdout', *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+        env=env
+    )
+    while True:
+        try:
+            output, _ = process.communicate(timeout=0.05)
+            return output.decode('utf-8', errors='ignore')
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                # Kill the whole process group in case tesseract is a wrapper script
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+                process.communicate()
+                raise OCRCancelled()
+
+def tesseract_to_string(image, config, cancel_event=None, image_path=None):
+    """Run Tesseract on an image; the process is killed if cancel_event gets set
+
+    image_path, if given, is an already encoded copy of image from tesseract_input.
+    """
+    if cancel_event is None:
+        return pytesseract.image_to_string(image if image_path is None else image_path, config=config)
+    if image_path is None:
+        with tesseract_input(image) as image_path:
+            return _run_tesseract(image_path, shlex.split(config), cancel_event)
+    return _run_tesseract(image_path, shlex.split(config), cancel_event)
+
+def tesseract_to_data(image, config, cancel_event=None, image_path=None):
+    """Run Tesseract in TSV mode and return (text, mean word confidence)
+
+    image_path, if given, is an already encoded copy of image from tesseract_input.
+    """
+    if image_path is None:
+        with tesseract_input(image) as image_path:
+            return tesseract_to_data(image, config, cancel_event, image_path)
+    # Several of these run side by side, so keep each one to a single OpenMP thread
+    env = dict(os.environ, OMP_THREAD_LIMIT='1')
+    tsv = _run_tesseract(image_path, [*shlex.split(config), '-c', 'tessedit_create_tsv=1'], cancel_event, env)
+    
+    lines = {}
+    confidences = []
+    for row in tsv.splitlines()[1:]:
+        fields = row.split('\t')
+        if len(fields) < 12 or not fields[11].strip():
+            continue
+        try:
+            confidence = float(fields[10])
+        except ValueError:
+            continue
+        if confidence < 0:
+            continue
+        # Group words by (block, paragraph, line) to rebuild the line layout
+        lines.setdefault((int(fields[2]), int(fields[3]), int(fields[4])), []).append(fields[11])
+        confidences.append(confidence)
+    
+    text = '\n'.join(' '.join(words) for _, words in sorted(lines.items()))
+    mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, mean_confidence
+
+def _is_meaningful(text):
+    return bool(text) and not all(c.isdigit() or c.isspace() for c in text)
+
+def _tesseract_sequential(image, image_path, has_hindi, cancel_event, start_time):
+    # Try with different page segmentation modes if needed
+    for psm in TESSERACT_PSM_MODES:
+        config = f'--oem 3 --psm {psm}' + (' -l hin+eng' if has_hindi else '')
+        with metrics.span('tesseract_psm', psm=str(psm)):
+            text = tesseract_to_string(image, config, cancel_event, image_path)
+        
+        # Clean the text
+        text = text.strip()
+        
+        # Check if the result is meaningful
+        if _is_meaningful(text):
+            logger.info(f"Tesseract (PSM {psm}) completed in {time.time() - start_time:.2f} seconds")
+            logger.info(f"Tesseract result: {text[:100]}...")
+            return text
+    return None
+
+def _timed_tesseract_to_data(psm, image, image_path, config, cancel_event):
+    with metrics.span('tesseract_psm', psm=str(psm)):
+        return tesseract_to_data(image, config, cancel_event, image_path)
+
+def _tesseract_best_psm(image, image_path, has_hindi, cancel_event, start_time):
+    """Run every candidate PSM in parallel and keep the most confident meaningful result"""
+    futures = {
+        _tesseract_executor.submit(
+            _timed_tesseract_to_data,
+            psm,
+            image,
+            image_path,
+            f'--oem 3 --psm {psm}' + (' -l hin+eng' if has_hindi else ''),
+            cancel_event
+        ): psm
+        for psm in TESSERACT_PSM_MODES
+    }
+    best = None
+    try:
+        for future in as_completed(futures):
+            psm = futures[future]
+            text, confidence = future.result()
+            text = text.strip()
+            logger.info(f"Tesseract PSM {psm} finished with confidence {confidence:.1f}")
+            if _is_meaningful(text) and (best is None or confidence > best[1]):
+                best = (text, confidence, psm)
+    finally:
+        for future in futures:
+            future.cancel()
+    
+    if best is None:
+        return None
+    text, confidence, psm = best
+    logger.info(f"Tesseract (PSM {psm}, confidence {confidence:.1f}) completed in {time.time() - start_time:.2f} seconds")
+    logger.info(f"Tesseract result: {text[:100]}...")
+    return text
+
+def use_tesseract_for_hindi(image_dict, cancel_event=None):
     """Use Tesseract OCR configured for Hindi"""
     try:
         has_hindi = check_tesseract_hindi()
@@ -169,48 +449,125 @@ def use_tesseract_for_hindi(image_dict):
         if enhanced_image is None:
             return None
             
-        logger.info("Performing OCR with Tesseract")
+        logger.info(f"Performing OCR with Tesseract ({TESSERACT_STRATEGY})")
         start_time = time.time()
         
-        # Configure Tesseract for Hindi
-        if has_hindi:
-            custom_config = r'--oem 3 --psm 6 -l hin+eng'
-        else:
-            custom_config = r'--oem 3 --psm 6'  # Use default language
-            
-        # Try with different page segmentation modes if needed
-        psm_modes = [6, 4, 3, 11]
-        
-        for psm in psm_modes:
-            config = f'--oem 3 --psm {psm}' + (' -l hin+eng' if has_hindi else '')
-            text = pytesseract.image_to_string(enhanced_image, config=config)
-            
-            # Clean the text
-            text = text.strip()
-            
-            # Check if the result is meaningful
-            if text and not all(c.isdigit() or c.isspace() for c in text):
-                logger.info(f"Tesseract (PSM {psm}) completed in {time.time() - start_time:.2f} seconds")
-                logger.info(f"Tesseract result: {text[:100]}...")
+        with metrics.span('ocr_engine', engine='tesseract'):
+            # Every PSM run reads the same encoded copy of the image
+            with tesseract_input(enhanced_image) as image_path:
+                if TESSERACT_STRATEGY == 'sequential':
+                    text = _tesseract_sequential(enhanced_image, image_path, has_hindi, cancel_event, start_time)
+                else:
+                    text = _tesseract_best_psm(enhanced_image, image_path, has_hindi, cancel_event, start_time)
+            if text:
                 return text
-        
-        # If all PSM modes failed, try one more time with the original image
-        text = pytesseract.image_to_string(
-            image_dict.get('original'), 
-            config=r'--oem 3 --psm 6' + (' -l hin+eng' if has_hindi else '')
-        )
+            
+            # If all PSM modes failed, try one more time with the original image
+            with metrics.span('tesseract_psm', psm='original'):
+                text = tesseract_to_string(
+                    image_dict.get('original'), 
+                    r'--oem 3 --psm 6' + (' -l hin+eng' if has_hindi else ''),
+                    cancel_event
+                )
         
         logger.info(f"Tesseract (final attempt) completed in {time.time() - start_time:.2f} seconds")
         return text.strip()
+    except OCRCancelled:
+        logger.info("Tesseract cancelled - another OCR engine won")
+        return None
     except Exception as e:
         logger.error(f"Error using Tesseract: {str(e)}")
         return None
 
-def perform_hindi_ocr(image_input):
+def is_acceptable_text(text):
+    """Acceptance check applied to every OCR engine result"""
+    return bool(text) and len(text) > 5 and not all(c.isdigit() or c.isspace() for c in text)
+
+def _record_engine(details, engine):
+    with _engine_wins_lock:
+        _engine_wins[engine] = _engine_wins.get(engine, 0) + 1
+    metrics.inc('ocr_engine_wins_total', engine=engine)
+    if details is not None:
+        details['engine'] = engine
+
+def get_engine_stats():
+    """Return how many requests each OCR engine has won in this process"""
+    with _engine_wins_lock:
+        return dict(_engine_wins)
+
+def _run_engines_sequential(image_versions, details):
+    # Try EasyOCR (specialized for Hindi)
+    easyocr_text = use_easyocr(image_versions)
+    if is_acceptable_text(easyocr_text):
+        logger.info("Successfully extracted text using EasyOCR")
+        _record_engine(details, 'easyocr')
+        return easyocr_text
+    
+    # Try Tesseract
+    tesseract_text = use_tesseract_for_hindi(image_versions)
+    if is_acceptable_text(tesseract_text):
+        logger.info("Successfully extracted text using Tesseract")
+        _record_engine(details, 'tesseract')
+        return tesseract_text
+    
+    return _fallback_result({'easyocr': easyocr_text, 'tesseract': tesseract_text}, details)
+
+def _run_engines_race(image_versions, details):
+    """Run both engines at once and return the first acceptable result allowed by OCR_RACE_POLICY"""
+    cancel_event = threading.Event()
+    futures = {
+        _race_executor.submit(use_easyocr, image_versions): 'easyocr',
+        _race_executor.submit(use_tesseract_for_hindi, image_versions, cancel_event): 'tesseract'
+    }
+    results = {}
+    try:
+        for future in as_completed(futures):
+            engine = futures[future]
+            results[engine] = future.result()
+            logger.info(f"{engine} finished in OCR race")
+            
+            winner = None
+            if OCR_RACE_POLICY == 'first':
+                if is_acceptable_text(results[engine]):
+                    winner = engine
+            else:
+                # 'priority': an engine wins once every engine ranked above it has been rejected
+                for candidate in OCR_ENGINE_PRIORITY:
+                    if candidate not in results:
+                        break
+                    if is_acceptable_text(results[candidate]):
+                        winner = candidate
+                        break
+            
+            if winner is not None:
+                logger.info(f"Successfully extracted text using {winner} (race)")
+                _record_engine(details, winner)
+                return results[winner]
+    finally:
+        # Kill the Tesseract process if it is still running. EasyOCR cannot be
+        # interrupted mid-inference; its thread finishes and the result is dropped.
+        cancel_event.set()
+    
+    return _fallback_result(results, details)
+
+def _fallback_result(results, details):
+    # If all methods failed or returned only digits
+    for engine in OCR_ENGINE_PRIORITY:
+        if results.get(engine):
+            _record_engine(details, engine)
+            return results[engine]
+    
+    logger.warning("All OCR methods failed to extract meaningful Hindi text")
+    _record_engine(details, 'none')
+    return "OCR पहचान में समस्या। कृपया अधिक स्पष्ट छवि का प्रयास करें।"
+
+def perform_hindi_ocr(image_input, details=None):
     """Main function to perform Hindi OCR using multiple methods
     
     Args:
         image_input: Can be either a file path (string) or a file object (from Flask upload)
+        details: Optional dict that receives the name of the engine that produced the text
+            and the original/decoded image size and scale factor
     """
     logger.info(f"Starting OCR on image input: {type(image_input)}")
     
@@ -223,45 +580,38 @@ def perform_hindi_ocr(image_input):
             # Reset file pointer and read image data
             image_input.seek(0)
             image_data = image_input.read()
-            
-            # Convert file data to OpenCV image
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
         else:
             # It's a file path
             logger.info(f"Processing file path: {image_input}")
-            
-            # Read the image from file path
-            image = cv2.imread(image_input)
+            with open(image_input, 'rb') as f:
+                image_data = f.read()
+        
+        # Decode at reduced resolution where possible, rejecting oversized images up front
+        with metrics.span('decode'):
+            try:
+                image, decode_info = decode_image(image_data)
+            except ImageTooLarge as e:
+                logger.warning(str(e))
+                return f"Error: {str(e)}"
         
         if image is None:
             logger.error("Failed to read/decode image")
             return "Error: Could not read the image file."
         
+        if details is not None:
+            details['image'] = decode_info
+        
         # Enhance the image for Hindi OCR
         image_versions = enhance_image_for_hindi_ocr(image)
         
-        # Try EasyOCR (specialized for Hindi)
-        easyocr_text = use_easyocr(image_versions)
-        if easyocr_text and len(easyocr_text) > 5 and not all(c.isdigit() or c.isspace() for c in easyocr_text):
-            logger.info("Successfully extracted text using EasyOCR")
-            return easyocr_text
-        
-        # Try Tesseract
-        tesseract_text = use_tesseract_for_hindi(image_versions)
-        if tesseract_text and len(tesseract_text) > 5 and not all(c.isdigit() or c.isspace() for c in tesseract_text):
-            logger.info("Successfully extracted text using Tesseract")
-            return tesseract_text
-        
-        # If all methods failed or returned only digits
-        if easyocr_text:
-            return easyocr_text
-        if tesseract_text:
-            return tesseract_text
-            
-        logger.warning("All OCR methods failed to extract meaningful Hindi text")
-        return "OCR पहचान में समस्या। कृपया अधिक स्पष्ट छवि का प्रयास करें।"
+        try:
+            if OCR_MODE == 'race':
+                return _run_engines_race(image_versions, details)
+            return _run_engines_sequential(image_versions, details)
+        finally:
+            logger.info(f"Image variants materialized: {', '.join(image_versions.materialized)}")
+            if details is not None:
+                details['image_variants'] = image_versions.materialized
         
     except Exception as e:
         logger.error(f"Error in OCR process: {str(e)}", exc_info=True)
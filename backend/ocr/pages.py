@@ -0,0 +1,176 @@
+import io
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageSequence
+
+from ocr.decode import check_pixel_budget, ImageTooLarge, MAX_IMAGE_PIXELS
+
+try:
+    import fitz  # PyMuPDF, only needed for PDF uploads
+except ImportError:
+    fitz = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MULTI_PAGE_EXTENSIONS = {'tif', 'tiff', 'pdf'}
+
+# Resolution used to rasterize PDF pages
+PDF_DPI = int(os.getenv("PDF_DPI", "200"))
+
+# Web workers on this host (gunicorn.conf.py exports the count); each one has its own page pool
+SERVER_WORKERS = int(os.getenv("GUNICORN_WORKERS", "1"))
+# Number of OCR processes per pool; each one loads its own EasyOCR reader on first use,
+# so by default the cores are split between the workers' pools instead of given to each
+PAGE_PROCESSES = int(os.getenv("OCR_PAGE_PROCESSES", str(max(1, (os.cpu_count() or 1) // SERVER_WORKERS))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Starting OCR page pool with {PAGE_PROCESSES} processes")
+            # spawn rather than fork: forking a process that already holds torch threads can hang
+            _pool = ProcessPoolExecutor(
+                max_workers=PAGE_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _encode_png(image):
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _over_budget(width, height, max_pixels):
+    """The ImageTooLarge error for a page over the pixel budget, or None"""
+    try:
+        check_pixel_budget(width, height, max_pixels)
+    except ImageTooLarge as e:
+        logger.warning(str(e))
+        return e
+    return None
+
+
+def iter_pages(file, filename, max_pixels=MAX_IMAGE_PIXELS):
+    """Yield the encoded bytes of each page of an uploaded file, one page at a time
+
+    Single images are passed through untouched (decode_image checks their
+    size); multi-page TIFFs and PDFs are split lazily so only the page being
+    handed out is decoded. A TIFF frame or PDF page over max_pixels is
+    yielded as an ImageTooLarge error instead, without decoding or
+    rasterizing it, so the caller can report that page and go on.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+    if extension == 'pdf':
+        if fitz is None:
+            raise ValueError("PDF support requires PyMuPDF (pip install pymupdf)")
+        document = fitz.open(stream=file.read(), filetype='pdf')
+        try:
+            for page in document:
+                # Page size is in points (1/72 inch)
+                scale = PDF_DPI / 72
+                too_large = _over_budget(round(page.rect.width * scale), round(page.rect.height * scale), max_pixels)
+                yield too_large if too_large is not None else page.get_pixmap(dpi=PDF_DPI).tobytes('png')
+        finally:
+            document.close()
+        return
+
+    if extension in ('tif', 'tiff'):
+        try:
+            image = Image.open(file)
+        except Image.DecompressionBombError as e:
+            # Far beyond PIL's own limit, and so beyond any sensible budget
+            yield ImageTooLarge(str(e))
+            return
+        if getattr(image, 'n_frames', 1) > 1:
+            for frame in ImageSequence.Iterator(image):
+                # Seeking reads only the frame's header; its pixels are decoded by _encode_png
+                too_large = _over_budget(*frame.size, max_pixels)
+                yield too_large if too_large is not None else _encode_png(frame)
+            return
+        file.seek(0)
+
+    yield file.read()
+
+
+def ocr_page(page_bytes):
+    """Run perform_hindi_ocr on one encoded page; executed inside a pool process"""
+    from ocr.hindi_ocr import perform_hindi_ocr
+
+    start_time = time.time()
+    text = perform_hindi_ocr(io.BytesIO(page_bytes))
+    return text, time.time() - start_time
+
+
+def ocr_pages(pages):
+    """Run OCR over (source, page_index, page_bytes) tuples in the process pool
+
+    At most twice the pool size is in flight at once, so pages are decoded and
+    handed over as workers free up instead of all up front. Results come back
+    in input order; pages iter_pages rejected as too large get an error text.
+    """
+    pool = _get_pool()
+    max_in_flight = PAGE_PROCESSES * 2
+    in_flight = {}
+    results = {}
+    order = []
+
+    try:
+        for source, page_index, page_bytes in pages:
+            position = len(order)
+            order.append((source, page_index))
+            if isinstance(page_bytes, ImageTooLarge):
+                results[position] = (f"Error: {str(page_bytes)}", 0.0)
+                continue
+            in_flight[pool.submit(ocr_page, page_bytes)] = position
+
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[in_flight.pop(future)] = future.result()
+
+        for future in list(in_flight):
+            results[in_flight.pop(future)] = future.result()
+    except BrokenProcessPool:
+        logger.error("OCR page pool crashed; it will be restarted on the next batch")
+        _reset_pool()
+        raise
+    finally:
+        # Don't leave queued pages behind if a page failed
+        for future in in_flight:
+            future.cancel()
+
+    page_results = []
+    for position, (source, page_index) in enumerate(order):
+        text, seconds = results[position]
+        page_results.append({
+            'source': source,
+            'page': page_index,
+            'text': text,
+            'ocr_time': f"{seconds:.2f} seconds"
+        })
+    return page_results
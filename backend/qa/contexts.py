@@ -0,0 +1,101 @@
+import os
+
+# Token budget of a packed question-generation context; 0 sends each sentence on its own
+QG_CONTEXT_TOKENS = int(os.getenv("QG_CONTEXT_TOKENS", "0"))
+# Sentences repeated at the start of the next context so questions can use what came just before
+QG_CONTEXT_OVERLAP = int(os.getenv("QG_CONTEXT_OVERLAP", "1"))
+
+# The QG model truncates its input here
+MAX_MODEL_TOKENS = 512
+# Contexts shorter than this rarely give a usable question
+MIN_CONTEXT_CHARS = 20
+
+
+class ContextWindow:
+    """Neighbouring sentences sent to question generation as one context"""
+
+    __slots__ = ('sentences', 'text')
+
+    def __init__(self, sentences):
+        self.sentences = list(sentences)
+        self.text = ' '.join(self.sentences)
+
+    def source_sentence(self, answer):
+        """The sentence of this window an answer came from
+
+        Answers are spans of the context (or, from the rule-based fallback,
+        whole sentences of it), so the sentence containing the answer's
+        start is used; otherwise the sentence sharing the most words.
+        """
+        if len(self.sentences) == 1:
+            return self.sentences[0]
+        offset = self.text.find(answer.strip()) if answer else -1
+        if offset >= 0:
+            position = 0
+            for sentence in self.sentences:
+                position += len(sentence) + 1
+                if offset < position:
+                    return sentence
+        words = set(answer.split()) if answer else set()
+        return max(self.sentences, key=lambda sentence: len(words & set(sentence.split())))
+
+
+def single_sentence_contexts(sentences):
+    """One window per sentence, skipping the very short ones (the behaviour without packing)"""
+    return [ContextWindow([sentence]) for sentence in sentences if len(sentence.strip()) >= MIN_CONTEXT_CHARS]
+
+
+def _split_long_sentence(sentence, tokenizer, max_tokens):
+    """Break a sentence over the budget into word runs that fit it"""
+    pieces, words, count = [], [], 0
+    for word in sentence.split():
+        word_tokens = len(tokenizer.tokenize(word))
+        if words and count + word_tokens > max_tokens:
+            pieces.append((' '.join(words), count))
+            words, count = [], 0
+        words.append(word)
+        count += word_tokens
+    if words:
+        pieces.append((' '.join(words), count))
+    return pieces
+
+
+def pack_contexts(sentences, tokenizer, max_tokens=QG_CONTEXT_TOKENS, overlap=QG_CONTEXT_OVERLAP, reserved_tokens=0):
+    """Pack consecutive sentences into windows of at most max_tokens tokens
+
+    reserved_tokens are kept free for the prompt prefix. Each window after the
+    first starts with up to overlap sentences from the end of the previous
+    one, as long as they leave room for at least one new sentence. Sentences
+    longer than the budget are split at word boundaries.
+    """
+    budget = max(min(max_tokens, MAX_MODEL_TOKENS) - reserved_tokens, 1)
+
+    units = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        count = len(tokenizer.tokenize(sentence))
+        if count > budget:
+            units.extend(_split_long_sentence(sentence, tokenizer, budget))
+        else:
+            units.append((sentence, count))
+
+    windows = []
+    current, current_tokens = [], 0
+    for text, count in units:
+        if current and current_tokens + count > budget:
+            windows.append(current)
+            # Carry over at most overlap sentences, and never the whole previous window
+            carried = current[-overlap:] if overlap > 0 else []
+            carried = carried[-(len(current) - 1):] if len(current) > 1 else []
+            while carried and sum(c for _, c in carried) + count > budget:
+                carried = carried[1:]
+            current, current_tokens = list(carried), sum(c for _, c in carried)
+        current.append((text, count))
+        current_tokens += count
+    if current:
+        windows.append(current)
+
+    contexts = [ContextWindow(text for text, _ in window) for window in windows]
+    return [context for context in contexts if len(context.text) >= MIN_CONTEXT_CHARS]
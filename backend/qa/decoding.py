@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+
+# Question generation decoding settings, best quality first
+QG_DECODING_TIERS = {
+    'full_beam': dict(num_beams=5, max_length=64, early_stopping=True, no_repeat_ngram_size=2),
+    'small_beam': dict(num_beams=2, max_length=48, early_stopping=True, no_repeat_ngram_size=2),
+    'greedy': dict(num_beams=1, max_length=32, no_repeat_ngram_size=2),
+}
+TIER_ORDER = list(QG_DECODING_TIERS)
+
+DEFAULT_QG_TIER = os.getenv("QG_DECODING_TIER", "full_beam")
+
+# Rough cost of a sentence at each tier relative to full_beam, used until the tier has been timed
+TIER_RELATIVE_COST = {'full_beam': 1.0, 'small_beam': 0.45, 'greedy': 0.2}
+
+
+# Seconds per generated sentence at each tier, smoothed over recent chunks of every request
+_observed_costs = {}
+_observed_costs_lock = threading.Lock()
+_SMOOTHING = 0.3
+
+
+def resolve_tier(tier=None):
+    """Return tier, or the default tier when None; raises ValueError for unknown names"""
+    tier = tier or DEFAULT_QG_TIER
+    if tier not in QG_DECODING_TIERS:
+        raise ValueError(f"Unknown decoding tier '{tier}' (use one of: {', '.join(TIER_ORDER)})")
+    return tier
+
+
+def tiers_at_least(tier):
+    """Tiers whose output is at least as good as tier's, best first"""
+    return TIER_ORDER[:TIER_ORDER.index(tier) + 1]
+
+
+class LatencyBudget:
+    """Chooses a decoding tier for each chunk of sentences so the document fits a time budget
+
+    Tiers only ever get cheaper during a document. Per-sentence cost is
+    measured as chunks complete and shared across requests, so even the
+    first chunk of a document is planned from recent timings; a tier that
+    hasn't run yet is estimated from the nearest measured tier in
+    TIER_ORDER through TIER_RELATIVE_COST.
+    """
+
+    def __init__(self, budget, tier):
+        self.budget = budget
+        self.deadline = time.monotonic() + budget
+        self.tier = tier
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def record(self, tier, sentences, seconds):
+        if not sentences:
+            return
+        per_sentence = seconds / sentences
+        with _observed_costs_lock:
+            previous = _observed_costs.get(tier)
+            _observed_costs[tier] = per_sentence if previous is None else (
+                _SMOOTHING * per_sentence + (1 - _SMOOTHING) * previous
+            )
+
+    def _estimate(self, tier, sentences):
+        with _observed_costs_lock:
+            costs = dict(_observed_costs)
+        if tier in costs:
+            return costs[tier] * sentences
+        if not costs:
+            return None
+        # Scale from the measured tier closest in cost, preferring the better one on a tie
+        position = TIER_ORDER.index(tier)
+        reference = min(
+            costs,
+            key=lambda measured: (abs(TIER_ORDER.index(measured) - position), TIER_ORDER.index(measured))
+        )
+        return costs[reference] / TIER_RELATIVE_COST[reference] * TIER_RELATIVE_COST[tier] * sentences
+
+    def choose(self, remaining_sentences, next_chunk):
+        """Tier for the next chunk, or None when not even the cheapest tier can finish it in time"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            return None
+
+        candidates = TIER_ORDER[TIER_ORDER.index(self.tier):]
+        for tier in candidates:
+            estimate = self._estimate(tier, remaining_sentences)
+            if estimate is None or estimate <= remaining:
+                self.tier = tier
+                return tier
+
+        # The rest of the document won't fit; keep going at the cheapest tier while chunks still do
+        cheapest = candidates[-1]
+        self.tier = cheapest
+        if self._estimate(cheapest, next_chunk) <= remaining:
+            return cheapest
+        return None
@@ -0,0 +1,69 @@
+import os
+import hashlib
+
+import numpy as np
+
+# Jaccard similarity of character shingles above which a sentence counts as a repeat (0 disables the filter)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity almost always share a band
+BANDS = 16
+
+_rng = np.random.default_rng(20240601)
+# Odd multipliers for multiply-shift hashing; uint64 arithmetic wraps around
+_MULTIPLIERS = _rng.integers(1, 2**63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of overlapping character n-grams of text with whitespace collapsed"""
+    text = ' '.join(text.split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERMUTATIONS values) of the text's shingles"""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles(text)),
+        dtype=np.uint64
+    )
+    permuted = (_MULTIPLIERS[:, None] * hashes[None, :] + _OFFSETS[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1)
+
+
+class NearDuplicateFilter:
+    """Remembers the sentences of one document and flags those that repeat an earlier one
+
+    Signatures are bucketed by band (LSH), so each check only compares
+    against sentences that share at least one band.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._signatures = []
+        self._buckets = {}
+
+    def _bands(self, signature):
+        rows = NUM_PERMUTATIONS // BANDS
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+    def is_duplicate(self, text):
+        """True if text is a near-duplicate of a sentence seen before; otherwise remember it"""
+        signature = minhash(text)
+        bands = self._bands(signature)
+        candidates = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band in bands:
+            self._buckets.setdefault(band, []).append(index)
+        return False
@@ -1,154 +1,421 @@
 from indicnlp import common
 from indicnlp.normalize.indic_normalize import DevanagariNormalizer
 from indicnlp.tokenize import sentence_tokenize
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
-import re
+import os
+import time
+import logging
+import functools
+
+from core.model_registry import registry
+from core.batching import BATCHING_ENABLED, get_batcher
+from core.metrics import metrics
+from core.torch_runtime import prepare_for_cpu_inference
+from core.inference_server import model_loader
+from core.lazy_imports import lazy_import
+from qa.sentence_cache import sentence_cache, sentence_key
+from qa.near_duplicates import NearDuplicateFilter, NEAR_DUPLICATE_THRESHOLD
+from qa.decoding import QG_DECODING_TIERS, LatencyBudget, resolve_tier, tiers_at_least
+from qa.contexts import QG_CONTEXT_TOKENS, QG_CONTEXT_OVERLAP, pack_contexts, single_sentence_contexts
+from qa.rule_answers import RULE_ANSWER_THRESHOLD, ContextIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# transformers (and torch behind it) is only imported when a model is loaded
+transformers = lazy_import('transformers')
+
+QG_MODEL_NAME = "ai4bharat/MultiIndicQuestionGenerationSS"
+QA_MODEL_NAME = "AVISHKAARAM/avishkaarak-ekta-hindi"
+
+# Prompt the question generation model expects before each context
+QG_PROMPT_PREFIX = "generate question: "
+
+# Maximum number of sentences decoded together by the question generator
+QG_BATCH_SIZE = int(os.getenv("QG_BATCH_SIZE", "8"))
+# Also batch sentences of different token lengths, padding the shorter ones. Larger batches,
+# but padding can change which beam wins, so a question may differ from decoding its sentence alone
+QG_PADDED_BATCHES = os.getenv("QG_PADDED_BATCHES", "0") == "1"
+# The question generation model truncates its input here
+QG_MAX_INPUT_TOKENS = 512
+# Batch size used by the QA pipeline when answering many questions at once
+QA_BATCH_SIZE = int(os.getenv("QA_BATCH_SIZE", "8"))
+
+def _load_qg_tokenizer():
+    return transformers.AutoTokenizer.from_pretrained(QG_MODEL_NAME)
+
+def _load_qg_model(precision=None):
+    model = transformers.AutoModelForSeq2SeqLM.from_pretrained(QG_MODEL_NAME)
+    return prepare_for_cpu_inference(model, precision)
+
+def _load_qa_pipeline(precision=None):
+    model = transformers.AutoModelForQuestionAnswering.from_pretrained(QA_MODEL_NAME)
+    return transformers.pipeline(
+        "question-answering",
+        model=prepare_for_cpu_inference(model, precision),
+        tokenizer=transformers.AutoTokenizer.from_pretrained(QA_MODEL_NAME)
+    )
+
+# Short input for the dummy inference run at warm-up
+WARMUP_SENTENCE = "भारत की राजधानी नई दिल्ली है।"
+
+def _warm_up_qg_model(model):
+    inputs = registry.get('qg_tokenizer')([QG_PROMPT_PREFIX + WARMUP_SENTENCE], return_tensors="pt")
+    inputs.pop('token_type_ids', None)
+    model.generate(**inputs, max_length=8)
+
+def _warm_up_qa_pipeline(qa_pipeline):
+    qa_pipeline(question="भारत की राजधानी क्या है?", context=WARMUP_SENTENCE)
+
+# Models are loaded once per process and shared by every HindiQAGenerator;
+# with INFERENCE_SERVER_SOCKET set only the tokenizer is loaded here
+registry.register('qg_tokenizer', _load_qg_tokenizer)
+registry.register('qg_model', model_loader('qg_model', _load_qg_model), warmup=_warm_up_qg_model)
+registry.register('qa_pipeline', model_loader('qa_pipeline', _load_qa_pipeline), warmup=_warm_up_qa_pipeline)
+
+def _batched_decode_questions(contexts, tier=None):
+    return HindiQAGenerator()._decode_questions(contexts, tier)
+
+def _batched_answer(pairs, qa_pipeline=None):
+    qa_pipeline = qa_pipeline or registry.get('qa_pipeline')
+    with metrics.span('answer_extraction'):
+        results = qa_pipeline(
+            question=[question for question, _ in pairs],
+            context=[context for _, context in pairs],
+            max_answer_len=150,
+            handle_impossible_answer=True,
+            batch_size=QA_BATCH_SIZE
+        )
+    # The pipeline unwraps single-element inputs
+    return [results] if isinstance(results, dict) else results
 
 class HindiQAGenerator:
-    def __init__(self):
+    def __init__(self, qg_tokenizer=None, qg_model=None, qa_pipeline=None, rule_answer_threshold=None):
         # Initialize normalizer
         self.normalizer = DevanagariNormalizer()
         
-        # Load question generation model and tokenizer
-        self.qg_tokenizer = AutoTokenizer.from_pretrained("ai4bharat/MultiIndicQuestionGenerationSS")
-        self.qg_model = AutoModelForSeq2SeqLM.from_pretrained("ai4bharat/MultiIndicQuestionGenerationSS")
+        # Question generation model and tokenizer (shared registry copies unless given)
+        self.qg_tokenizer = qg_tokenizer or registry.get('qg_tokenizer')
+        self.qg_model = qg_model or registry.get('qg_model')
         
-        # Load Hindi QA pipeline
-        self.qa_pipeline = pipeline(
-            "question-answering",
-            model="AVISHKAARAM/avishkaarak-ekta-hindi",
-            tokenizer="AVISHKAARAM/avishkaarak-ekta-hindi"
-        )
+        # Hindi QA pipeline
+        self.qa_pipeline = qa_pipeline or registry.get('qa_pipeline')
+        # The shared cross-request batchers run the registry's models; given ones are called directly
+        self._shared_qg = qg_tokenizer is None and qg_model is None
+        self._shared_qa = qa_pipeline is None
+        # Confidence at which a rule-based answer replaces the QA model; 0 always runs the model
+        self.rule_answer_threshold = RULE_ANSWER_THRESHOLD if rule_answer_threshold is None else rule_answer_threshold
 
     def preprocess_text(self, text: str) -> list:
         """Normalize and split Hindi text into sentences."""
         normalized = self.normalizer.normalize(text)
         return sentence_tokenize.sentence_split(normalized, lang='hi')
 
-    def generate_questions(self, context: str) -> list:
-        """Generate a question from a Hindi sentence."""
-        inputs = self.qg_tokenizer(
-            f"generate question: {context}",
-            return_tensors="pt",
-            max_length=512,
-            truncation=True
-        )
-        # Remove token_type_ids if present
-        if 'token_type_ids' in inputs:
-            inputs.pop('token_type_ids')
-        outputs = self.qg_model.generate(
-            **inputs,
-            max_length=64,
-            num_beams=5,
-            early_stopping=True,
-            no_repeat_ngram_size=2
+    def build_contexts(self, sentences: list) -> list:
+        """Group sentences into question generation contexts (ContextWindows).
+
+        One context per sentence of at least 20 characters, or with
+        QG_CONTEXT_TOKENS set, neighbouring sentences packed up to that many
+        tokens so short sentences share a model call and long ones are split.
+        """
+        if QG_CONTEXT_TOKENS <= 0:
+            return single_sentence_contexts(sentences)
+        return pack_contexts(
+            sentences,
+            self.qg_tokenizer,
+            QG_CONTEXT_TOKENS,
+            QG_CONTEXT_OVERLAP,
+            reserved_tokens=len(self.qg_tokenizer.tokenize(QG_PROMPT_PREFIX))
         )
-        question = self.qg_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return [question.strip()] if question.strip() else []
 
-    def extract_answer(self, question: str, context: str) -> str:
+    def _decode_questions(self, contexts: list, tier: str = None, batch_size: int = None) -> list:
+        """Return a question string per context, decoded at the given tier in batches of at most batch_size.
+
+        Unless QG_PADDED_BATCHES is set, only contexts of the same token length
+        share a generate() call: nothing is padded, so each question is the one
+        its context would get decoded alone.
+        """
+        tier = resolve_tier(tier)
+        prompts = [QG_PROMPT_PREFIX + context for context in contexts]
+        lengths = [0] * len(prompts)
+        if len(prompts) > 1:
+            lengths = [min(len(self.qg_tokenizer.tokenize(prompt)), QG_MAX_INPUT_TOKENS) for prompt in prompts]
+        limit = batch_size or len(prompts)
+        batches = []
+        for i in sorted(range(len(prompts)), key=lambda i: lengths[i]):
+            if batches and len(batches[-1]) < limit and (QG_PADDED_BATCHES or lengths[batches[-1][0]] == lengths[i]):
+                batches[-1].append(i)
+            else:
+                batches.append([i])
+
+        questions = [None] * len(prompts)
+        for batch in batches:
+            inputs = self.qg_tokenizer(
+                [prompts[i] for i in batch],
+                return_tensors="pt",
+                max_length=QG_MAX_INPUT_TOKENS,
+                truncation=True,
+                padding=True
+            )
+            # Remove token_type_ids if present
+            if 'token_type_ids' in inputs:
+                inputs.pop('token_type_ids')
+            with metrics.span('question_generation', tier=tier):
+                outputs = self.qg_model.generate(**inputs, **QG_DECODING_TIERS[tier])
+            for i, output in zip(batch, outputs):
+                questions[i] = self.qg_tokenizer.decode(output, skip_special_tokens=True).strip()
+        return questions
+
+    def generate_questions(self, context: str, tier: str = None) -> list:
+        """Generate a question from a Hindi sentence."""
+        question = self._decode_questions([context], tier)[0]
+        return [question] if question else []
+
+    def generate_questions_batch(self, contexts: list, batch_size: int = None, tier: str = None) -> list:
+        """Generate questions for many sentences, decoding same-length sentences together.
+
+        Returns one list of questions per input context, in input order.
+        """
+        tier = resolve_tier(tier)
+        if BATCHING_ENABLED and self._shared_qg:
+            # Let the shared scheduler group these with same-tier sentences from concurrent requests
+            batcher = get_batcher(f'question_generation_{tier}', functools.partial(_batched_decode_questions, tier=tier))
+            questions = batcher.submit_many(contexts)
+            return [[question] if question else [] for question in questions]
+
+        batch_size = batch_size or QG_BATCH_SIZE
+        if batch_size <= 1:
+            return [self.generate_questions(context, tier) for context in contexts]
+
+        return [[question] if question else [] for question in self._decode_questions(contexts, tier, batch_size)]
+
+    def context_index(self, context: str, indexes: dict = None) -> ContextIndex:
+        """Return the rule-based answer index of a context, building it once per indexes dict."""
+        if indexes is None:
+            return ContextIndex(context, self.preprocess_text(context))
+        index = indexes.get(context)
+        if index is None:
+            index = indexes[context] = ContextIndex(context, self.preprocess_text(context))
+        return index
+
+    def _answer_from_result(self, result: dict, rule_answer) -> str:
+        """Accept a QA pipeline result or fall back to the rule-based answer."""
+        answer = result['answer'].strip()
+        score = result.get('score', 0)
+        
+        # Check if answer is too short (only a single character or word)
+        if len(answer) <= 2 or score < 0.1:
+            # If model returns short answer, use rule-based extraction
+            metrics.inc('answer_source_total', source='rule_based', reason='low_score')
+            answer = rule_answer.fallback
+        else:
+            metrics.inc('answer_source_total', source='model', reason='accepted')
+            
+        return answer
+
+    def _confident_rule_answer(self, question: str, context: str, indexes: dict = None):
+        """Return (rule-based answer, whether it is confident enough to skip the QA model)."""
+        rule_answer = self.context_index(context, indexes).answer(question)
+        confident = self.rule_answer_threshold > 0 and rule_answer.confidence >= self.rule_answer_threshold
+        if confident:
+            metrics.inc('answer_source_total', source='rule_based', reason='confident')
+            metrics.inc('qa_model_calls_avoided_total', model='answer_extraction', reason='rule_based')
+        return rule_answer, confident
+
+    def extract_answer(self, question: str, context: str, indexes: dict = None) -> str:
         """Extract answer from context for a given question."""
+        rule_answer, confident = self._confident_rule_answer(question, context, indexes)
+        if confident:
+            return rule_answer.answer
         try:
             # Configure pipeline for better answer extraction
-            result = self.qa_pipeline(
-                question=question,
-                context=context,
-                max_answer_len=150,  # Increase max answer length
-                handle_impossible_answer=True
-            )
-            
-            answer = result['answer'].strip()
-            score = result.get('score', 0)
-            
-            # Check if answer is too short (only a single character or word)
-            if len(answer) <= 2 or score < 0.1:
-                # If model returns short answer, use rule-based extraction
-                answer = self._extract_answer_rule_based(question, context)
-                
-            return answer
+            with metrics.span('answer_extraction'):
+                result = self.qa_pipeline(
+                    question=question,
+                    context=context,
+                    max_answer_len=150,  # Increase max answer length
+                    handle_impossible_answer=True
+                )
+            return self._answer_from_result(result, rule_answer)
         except Exception as e:
             # Fallback to rule-based extraction on error
-            return self._extract_answer_rule_based(question, context)
-
-    def _extract_answer_rule_based(self, question: str, context: str) -> str:
-        """Extract answer using rule-based approach when model fails."""
-        if re.search(r'कहाँ|कहां|स्थित|जगह', question):
-            locations = re.findall(r'([^।]+में\s[^।]+(?:स्थित है|है))', context)
-            if locations:
-                return locations[0].strip()
-                
-        if re.search(r'कब|वर्ष|साल|समय', question):
-            years = re.findall(r'(\d{4}(?:\s+में)?)', context)
-            if years:
-                # Find a sentence containing this year
-                for year in years:
-                    year_pattern = re.escape(year)
-                    sentences = re.findall(f'[^।]*{year_pattern}[^।]*', context)
-                    if sentences:
-                        return sentences[0].strip()
-        
-        if re.search(r'किसने|कौन|किस|द्वारा', question):
-            persons = re.findall(r'([^।]*(राजा|बादशाह|महाराजा|राष्ट्रपति|प्रधानमंत्री|नेता)[^।]*)', context)
-            if persons:
-                return persons[0][0].strip()
-                
-        if re.search(r'क्यों|कारण', question):
-            reasons = re.findall(r'([^।]*(के लिए|के कारण|की वजह से)[^।]*)', context)
-            if reasons:
-                return reasons[0][0].strip()
-        
-        # Extract nouns from question and find related sentences
-        # Extract key words from question by removing question words
-        question_words = set(question.split())
-        # Common Hindi question words to remove
-        hindi_question_words = {'क्या', 'कौन', 'कहाँ', 'कब', 'क्यों', 'कैसे', 'किस', 'किसने', 'किसको', 'कितना', 'है', 'हैं', 'था', 'थे', 'की', 'का', 'के'}
-        key_words = question_words - hindi_question_words
-        
-        # Find sentences that contain the most key words
-        sentences = self.preprocess_text(context)
-        best_match = None
-        max_matches = 0
-        
-        for sentence in sentences:
-            matches = sum(1 for word in key_words if word in sentence and len(word) > 2)
-            if matches > max_matches:
-                max_matches = matches
-                best_match = sentence
-        
-        if best_match:
-            return best_match
-            
-        # If all else fails, return the first sentence as the answer
-        sentences = self.preprocess_text(context)
-        if sentences:
-            return sentences[0]
-            
-        return context  # Last resort fallback
+            metrics.inc('answer_source_total', source='rule_based', reason='error')
+            return rule_answer.fallback
+
+    def extract_answers_batch(self, pairs: list, indexes: dict = None, details: dict = None) -> list:
+        """Extract answers for a list of (question, context) pairs in one pipeline call.
 
-    def generate_qa_pairs(self, hindi_text: str) -> list:
+        Pairs the rule-based extractor answers with confidence (a year for a
+        कब question, a place for कहाँ) skip the QA model. indexes caches the
+        per-context rule index across calls for one document; details, if
+        given, receives how many of the pairs skipped the model.
+        """
+        if not pairs:
+            return []
+        answers = [None] * len(pairs)
+        rule_answers = []
+        pending = []
+        for i, (question, context) in enumerate(pairs):
+            rule_answer, confident = self._confident_rule_answer(question, context, indexes)
+            rule_answers.append(rule_answer)
+            if confident:
+                answers[i] = rule_answer.answer
+            else:
+                pending.append(i)
+        if details is not None:
+            details['model_skipped'] = len(pairs) - len(pending)
+        if not pending:
+            return answers
+
+        model_pairs = [pairs[i] for i in pending]
+        try:
+            if BATCHING_ENABLED and self._shared_qa:
+                results = get_batcher('answer_extraction', _batched_answer).submit_many(model_pairs)
+            else:
+                results = _batched_answer(model_pairs, self.qa_pipeline)
+        except Exception as e:
+            logger.error(f"Batched answer extraction failed, answering one pair at a time: {str(e)}")
+            results = None
+        for i, result in zip(pending, results or [None] * len(pending)):
+            if result is None:
+                answers[i] = self.extract_answer(*pairs[i], indexes=indexes)
+            else:
+                answers[i] = self._answer_from_result(result, rule_answers[i])
+        return answers
+
+    def iter_qa_pairs(self, hindi_text: str, batch_size: int = None, chunk_size: int = None,
+                      tier: str = None, budget: float = None, details: dict = None):
+        """Yield QA pairs as they are produced.
+
+        Sentences are processed chunk_size at a time (the whole document by
+        default), so pairs for early sentences are yielded while later ones
+        are still being generated. Near-duplicates of earlier sentences are
+        skipped, and sentences seen by earlier requests come from the
+        sentence cache without touching the models.
+
+        tier picks the question decoding settings (see qa/decoding.py). With
+        a budget in seconds, later chunks drop to cheaper tiers when the rest
+        of the document would not fit, and generation stops once not even
+        greedy decoding can finish the next chunk in time. details, if
+        given, receives the tiers used, whether the result is partial and
+        how many answers skipped the QA model.
+        """
+        tier = resolve_tier(tier)
+        windows = self.build_contexts(self.preprocess_text(hindi_text))
+        contexts = [window.text for window in windows]
+        window_by_text = {window.text: window for window in windows}
+        # Rule-based answer index per context, built on first use for this document
+        indexes = {}
+        duplicates = NearDuplicateFilter() if NEAR_DUPLICATE_THRESHOLD > 0 else None
+        latency_budget = LatencyBudget(budget, tier) if budget is not None else None
+        if latency_budget is not None and chunk_size is None:
+            # The tier can only change between chunks
+            chunk_size = QG_BATCH_SIZE
+        chunk_size = chunk_size or max(len(contexts), 1)
+
+        report = {'tier': tier, 'tiers_used': [], 'partial': False, 'contexts': len(contexts), 'contexts_done': 0,
+                  'answers_extracted': 0, 'answer_model_skipped': 0}
+        if budget is not None:
+            report['budget_seconds'] = round(budget, 3)
+        if details is not None:
+            details['qa'] = report
+
+        for start in range(0, len(contexts), chunk_size):
+            chunk = []
+            for context in contexts[start:start + chunk_size]:
+                if duplicates is not None and duplicates.is_duplicate(context):
+                    metrics.inc('qa_sentences_total', outcome='near_duplicate')
+                    metrics.inc('qa_model_calls_avoided_total', model='question_generation', reason='near_duplicate')
+                    continue
+                chunk.append(context)
+
+            chunk_tier = tier
+            if latency_budget is not None:
+                chunk_tier = latency_budget.choose(len(contexts) - start, len(chunk))
+                if chunk_tier is None:
+                    logger.warning(f"QA budget of {budget:.1f}s exhausted after {start} of {len(contexts)} contexts")
+                    metrics.inc('qa_budget_outcomes_total', outcome='stopped')
+                    report['partial'] = True
+                    return
+            if chunk and chunk_tier not in report['tiers_used']:
+                report['tiers_used'].append(chunk_tier)
+
+            # Exact repeats within the chunk are generated once
+            results = {}
+            pending = []
+            for context in chunk:
+                key = sentence_key(context)
+                if key in results:
+                    continue
+                # Output of a better tier is just as good for a cheaper request
+                cached = sentence_cache.get(context, tiers_at_least(chunk_tier))
+                results[key] = cached
+                if cached is None:
+                    pending.append(context)
+                else:
+                    metrics.inc('qa_sentences_total', outcome='cache_hit')
+                    metrics.inc('qa_model_calls_avoided_total', model='question_generation', reason='sentence_cache')
+                    metrics.inc('qa_model_calls_avoided_total', len(cached), model='answer_extraction', reason='sentence_cache')
+
+            if pending:
+                metrics.inc('qa_sentences_total', len(pending), outcome='generated')
+                chunk_start = time.monotonic()
+                all_questions = self.generate_questions_batch(pending, batch_size, chunk_tier)
+                pairs = [
+                    (question, context)
+                    for context, questions in zip(pending, all_questions)
+                    for question in questions
+                ]
+                for context in pending:
+                    if context not in indexes:
+                        # Reuse the sentences the window was built from instead of splitting again
+                        indexes[context] = ContextIndex(context, window_by_text[context].sentences)
+                answer_details = {}
+                answers = self.extract_answers_batch(pairs, indexes, answer_details)
+                report['answers_extracted'] += len(pairs)
+                report['answer_model_skipped'] += answer_details.get('model_skipped', 0)
+                if latency_budget is not None:
+                    latency_budget.record(chunk_tier, len(pending), time.monotonic() - chunk_start)
+                generated = {sentence_key(context): [] for context in pending}
+                for (question, context), answer in zip(pairs, answers):
+                    generated[sentence_key(context)].append((question, answer))
+                for context in pending:
+                    key = sentence_key(context)
+                    results[key] = generated[key]
+                    sentence_cache.set(context, generated[key], chunk_tier)
+
+            report['contexts_done'] = min(start + chunk_size, len(contexts))
+            for context in chunk:
+                for question, answer in results[sentence_key(context)]:
+                    # Make sure we have a meaningful answer (not just a character or two)
+                    if answer and len(answer.strip()) > 3:
+                        yield {
+                            'context': context,
+                            'question': question,
+                            'answer': answer,
+                            'source_sentence': window_by_text[context].source_sentence(answer)
+                        }
+
+        if latency_budget is not None:
+            downgraded = any(used != tier for used in report['tiers_used'])
+            metrics.inc('qa_budget_outcomes_total', outcome='downgraded' if downgraded else 'met')
+
+    def generate_qa_pairs(self, hindi_text: str, batch_size: int = None, tier: str = None,
+                          budget: float = None, details: dict = None) -> list:
         """Run the full pipeline: preprocess, generate questions, extract answers."""
-        qa_pairs = []
-        sentences = self.preprocess_text(hindi_text)
-        for context in sentences:
-            if len(context.strip()) < 20:
-                continue
-            questions = self.generate_questions(context)
-            for question in questions:
-                answer = self.extract_answer(question, context)
-                # Make sure we have a meaningful answer (not just a character or two)
-                if answer and len(answer.strip()) > 3:
-                    qa_pairs.append({
-                        'context': context,
-                        'question': question,
-                        'answer': answer
-                    })
-        return qa_pairs
-
-def qa_all(ocr_text):
+        return list(self.iter_qa_pairs(hindi_text, batch_size, tier=tier, budget=budget, details=details))
+
+def qa_all(ocr_text, tier=None, budget=None, details=None):
+    # Cheap once the registry has the models loaded
     qa_engine = HindiQAGenerator()
-    results = qa_engine.generate_qa_pairs(ocr_text)
+    results = qa_engine.generate_qa_pairs(ocr_text, tier=tier, budget=budget, details=details)
     return results
 
+def qa_stream(ocr_text, chunk_size=1, tier=None, budget=None, details=None):
+    """Yield QA pairs for ocr_text, chunk_size sentences at a time"""
+    qa_engine = HindiQAGenerator()
+    yield from qa_engine.iter_qa_pairs(ocr_text, chunk_size=chunk_size, tier=tier, budget=budget, details=details)
+
 
 # Example Hindi paragraph
 # sample_text = """
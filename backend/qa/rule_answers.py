@@ -0,0 +1,234 @@
+import os
+import re
+from collections import namedtuple
+
+# Rule-based answers at or above this confidence are used without running the QA model (0 always runs it)
+RULE_ANSWER_THRESHOLD = float(os.getenv("RULE_ANSWER_THRESHOLD", "0.8"))
+
+# answer is the extracted span (or sentence), kind the rule that produced it. fallback is
+# what is returned when the model runs and its answer is rejected: the sentence or clause
+# the extractor gave before it returned spans, since a short span is only trusted when confident
+RuleAnswer = namedtuple('RuleAnswer', ['answer', 'confidence', 'kind', 'fallback'])
+
+# Question types in the order they are tried; a type whose question pattern
+# matches but finds nothing in the context falls through to the next
+QUESTION_PATTERNS = [
+    ('location', re.compile(r'कहाँ|कहां|स्थित|जगह')),
+    ('time', re.compile(r'कब|वर्ष|साल|समय')),
+    ('person', re.compile(r'किसने|कौन|किस|द्वारा')),
+    ('reason', re.compile(r'क्यों|कारण')),
+]
+
+# Interrogatives that leave no doubt about the answer type; without one a
+# location or time answer is only half as trustworthy
+CLEAR_INTERROGATIVES = {
+    'location': {'कहाँ', 'कहां'},
+    'time': {'कब'},
+}
+TIME_NOUNS = {'वर्ष', 'साल', 'सन्', 'सन'}
+
+# A standalone four-digit number from 1000 to 2099
+YEAR = re.compile(r'(?<!\d)(?:1\d{3}|20\d{2})(?!\d)')
+# Words after a number that make it a count or a measure rather than a year (1200 वर्ष पुराना, 5000 लोग)
+NON_YEAR_WORDS = {'वर्ष', 'वर्षों', 'साल', 'सालों', 'लोग', 'लोगों', 'व्यक्ति', 'रुपये', 'रुपए', 'रुपयों',
+                  'मीटर', 'किलोमीटर', 'मील', 'फीट', 'फुट', 'किलो', 'किलोग्राम', 'टन', 'घंटे', 'दिन', 'वर्ग'}
+MONTHS = ['जनवरी', 'फरवरी', 'फ़रवरी', 'मार्च', 'अप्रैल', 'मई', 'जून', 'जुलाई', 'अगस्त', 'सितंबर', 'सितम्बर',
+          'अक्टूबर', 'अक्तूबर', 'नवंबर', 'नवम्बर', 'दिसंबर', 'दिसम्बर']
+# Day and month written before a year; the answer is then the whole date (26 जनवरी 1950)
+DATE_PREFIX = re.compile(r'(?<!\S)(?:\d{1,2}\s+)?(?:' + '|'.join(MONTHS) + r')\s*,?\s*$')
+LOCATION_CLAUSE = re.compile(r'[^।]*में\s[^।]*(?:स्थित है|है)')
+PERSON_MARKER = re.compile(r'राजा|बादशाह|महाराजा|राष्ट्रपति|प्रधानमंत्री|नेता')
+REASON_MARKER = re.compile(r'के लिए|के कारण|की वजह से')
+PUNCTUATION = re.compile(r'[।॥?,.;:!"\'()\[\]]')
+
+# Common Hindi question words, ignored when matching questions to sentences
+QUESTION_WORDS = {'क्या', 'कौन', 'कहाँ', 'कहां', 'कब', 'क्यों', 'कैसे', 'किस', 'किसने', 'किसको', 'कितना',
+                  'है', 'हैं', 'था', 'थे', 'थी', 'की', 'का', 'के'}
+# Postpositions, conjunctions and auxiliaries; they never start or end an answer span
+FUNCTION_WORDS = {'के', 'की', 'का', 'में', 'पर', 'से', 'को', 'और', 'है', 'हैं', 'था', 'थे', 'थी', 'गया', 'गई', 'हुआ'}
+# Genitive links, the only function words allowed inside a place phrase (भारत के आगरा शहर)
+GENITIVE_WORDS = {'के', 'की', 'का'}
+# Words that end a place phrase: a plain कहाँ asks for one of these, कहाँ से for से
+LOCATIVE_MARKERS = {'में', 'पर', 'किनारे', 'पास', 'निकट', 'समीप'}
+ABLATIVE_MARKERS = {'से'}
+# Imperfective and infinitive endings (निकलती, गिरता, जाना); a phrase never extends over such a word
+VERB_ENDINGS = ('ती', 'ता', 'ते', 'ना', 'नी', 'कर')
+DIGITS = re.compile(r'\d')
+# Place phrases with more content words than this are more likely a whole clause than a place
+MAX_SPAN_WORDS = 6
+# Location answers are trusted less than years: only a single short place phrase
+# answering a plain कहाँ reaches the default RULE_ANSWER_THRESHOLD
+LOCATION_CONFIDENCE_CAP = 0.85
+
+# Confidence multipliers for the less certain cases
+UNCLEAR_QUESTION = 0.5
+AMBIGUOUS_SPAN = 0.5
+TIED_SENTENCES = 0.5
+# Whole-sentence answers are never good enough to skip the model on their own
+SENTENCE_ANSWER = 0.5
+
+
+def words(text):
+    """Words of text with punctuation removed"""
+    return PUNCTUATION.sub(' ', text).split()
+
+
+def years(sentence):
+    """(year, date expression) for each year in sentence; the expression includes a day and month written before it"""
+    found = []
+    for match in YEAR.finditer(sentence):
+        following = sentence[match.end():].split(maxsplit=1)
+        if following and PUNCTUATION.sub('', following[0]) in NON_YEAR_WORDS:
+            continue
+        date = DATE_PREFIX.search(sentence[:match.start()])
+        found.append((match.group(0), sentence[date.start() if date else match.start():match.end()]))
+    return found
+
+
+def question_keywords(question):
+    return {word for word in words(question) if word not in QUESTION_WORDS and word not in FUNCTION_WORDS}
+
+
+class ContextIndex:
+    """Sentences of one context with their words, years and answer markers
+
+    Built once per context, so every question asked about it reuses the
+    sentence split and the keyword lookup instead of redoing them.
+    """
+
+    def __init__(self, context, sentences):
+        self.context = context
+        self.sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
+        self.tokens = [sentence.split() for sentence in self.sentences]
+        self.keywords = {}
+        for i, sentence in enumerate(self.sentences):
+            for word in set(words(sentence)):
+                self.keywords.setdefault(word, []).append(i)
+        self.years = [years(sentence) for sentence in self.sentences]
+
+    def _overlap(self, keywords):
+        """Number of the question's keywords found in each sentence"""
+        scores = [0] * len(self.sentences)
+        for word in keywords:
+            for i in self.keywords.get(word, ()):
+                scores[i] += 1
+        return scores
+
+    def _best(self, candidates, scores, keywords):
+        """Best-matching candidate sentence and the confidence that it is the right one"""
+        best = max(candidates, key=lambda i: (scores[i], -i))
+        confidence = scores[best] / len(keywords) if keywords else 0.0
+        if sum(1 for i in candidates if scores[i] == scores[best]) > 1:
+            confidence *= TIED_SENTENCES
+        return best, confidence
+
+    def _time(self, question, keywords, scores):
+        question_years = set(YEAR.findall(question))
+        candidates = [i for i, found in enumerate(self.years) if {year for year, _ in found} - question_years]
+        if not candidates:
+            return None
+        best, confidence = self._best(candidates, scores, keywords)
+        question_words = set(words(question))
+        if not (question_words & CLEAR_INTERROGATIVES['time'] or
+                ('किस' in question_words and question_words & TIME_NOUNS)):
+            confidence *= UNCLEAR_QUESTION
+        found = [(year, date) for year, date in self.years[best] if year not in question_years]
+        if len({year for year, _ in found}) > 1:
+            # Several years in the sentence: only the model can tell which one is meant
+            return RuleAnswer(self.sentences[best], confidence * AMBIGUOUS_SPAN * SENTENCE_ANSWER, 'time',
+                              self.sentences[best])
+        return RuleAnswer(found[0][1], confidence, 'time', self.sentences[best])
+
+    def _place_phrases(self, i, question_words, markers):
+        """Noun phrases of sentence i that end in one of markers, with the marker
+
+        Each phrase is read backwards from its marker and stops at the first
+        word of the question, number, verb-like word or non-genitive
+        function word, so no phrase spans a clause boundary.
+        """
+        tokens = self.tokens[i]
+        plain = [PUNCTUATION.sub('', token) for token in tokens]
+        phrases = []
+        for end, marker in enumerate(plain):
+            if marker not in markers:
+                continue
+            start = end
+            while start > 0:
+                word = plain[start - 1]
+                if word in GENITIVE_WORDS:
+                    start -= 1
+                    continue
+                if (not word or word in question_words or word in FUNCTION_WORDS or
+                        DIGITS.search(word) or word.endswith(VERB_ENDINGS)):
+                    break
+                start -= 1
+            while start < end and plain[start] in GENITIVE_WORDS:
+                start += 1
+            if start < end:
+                phrases.append(' '.join(plain[start:end + 1]))
+        return phrases
+
+    def _location(self, question, keywords, scores):
+        question_words = words(question)
+        # कहाँ से asks where from; a plain कहाँ where
+        markers = LOCATIVE_MARKERS
+        for position, word in enumerate(question_words[:-1]):
+            if word in CLEAR_INTERROGATIVES['location'] and question_words[position + 1] in ABLATIVE_MARKERS:
+                markers = ABLATIVE_MARKERS
+        question_words = set(question_words)
+
+        phrases = {}
+        for i in range(len(self.sentences)):
+            found = self._place_phrases(i, question_words, markers)
+            if found:
+                phrases[i] = found
+        if not phrases:
+            # No phrase to cut out; fall back to the first clause that looks like a location
+            for sentence in self.sentences:
+                match = LOCATION_CLAUSE.search(sentence)
+                if match:
+                    return RuleAnswer(match.group(0).strip(), 0.0, 'location', match.group(0).strip())
+            return None
+        best, confidence = self._best(list(phrases), scores, keywords)
+        if not question_words & CLEAR_INTERROGATIVES['location']:
+            confidence *= UNCLEAR_QUESTION
+        phrase = phrases[best][0]
+        content_words = [word for word in phrase.split() if word not in FUNCTION_WORDS]
+        if len(phrases[best]) > 1 or len(content_words) > MAX_SPAN_WORDS:
+            confidence *= AMBIGUOUS_SPAN
+        clause = LOCATION_CLAUSE.search(self.sentences[best])
+        fallback = clause.group(0).strip() if clause else self.sentences[best]
+        return RuleAnswer(phrase, min(confidence, LOCATION_CONFIDENCE_CAP), 'location', fallback)
+
+    def _marked_sentence(self, marker, kind, keywords, scores):
+        candidates = [i for i, sentence in enumerate(self.sentences) if marker.search(sentence)]
+        if not candidates:
+            return None
+        best, confidence = self._best(candidates, scores, keywords)
+        return RuleAnswer(self.sentences[best], confidence * SENTENCE_ANSWER, kind, self.sentences[best])
+
+    def answer(self, question):
+        """Rule-based answer to question with a confidence between 0 and 1"""
+        keywords = question_keywords(question)
+        scores = self._overlap(keywords)
+        for kind, pattern in QUESTION_PATTERNS:
+            if not pattern.search(question):
+                continue
+            if kind == 'location':
+                result = self._location(question, keywords, scores)
+            elif kind == 'time':
+                result = self._time(question, keywords, scores)
+            elif kind == 'person':
+                result = self._marked_sentence(PERSON_MARKER, kind, keywords, scores)
+            else:
+                result = self._marked_sentence(REASON_MARKER, kind, keywords, scores)
+            if result is not None:
+                return result
+
+        # Otherwise the sentence sharing the most keywords with the question
+        if self.sentences and max(scores) > 0:
+            best, confidence = self._best(range(len(self.sentences)), scores, keywords)
+            return RuleAnswer(self.sentences[best], confidence * SENTENCE_ANSWER, 'keyword', self.sentences[best])
+        if self.sentences:
+            return RuleAnswer(self.sentences[0], 0.0, 'first_sentence', self.sentences[0])
+        return RuleAnswer(self.context, 0.0, 'context', self.context)
@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Sentences whose questions and answers are kept per process (0 disables the cache)
+SENTENCE_CACHE_SIZE = int(os.getenv("SENTENCE_CACHE_SIZE", "4096"))
+
+
+def sentence_key(sentence):
+    """Cache key of an already normalized sentence; whitespace differences don't count"""
+    return ' '.join(sentence.split())
+
+
+class SentenceCache:
+    """LRU of sentence -> [(question, answer), ...], shared by every request in the process
+
+    Textbook headers, footers and repeated lines come back across pages and
+    uploads; a hit skips both question generation and answer extraction.
+    Entries are stored per variant (the decoding tier), and a lookup may
+    accept several variants.
+    """
+
+    def __init__(self, max_entries=SENTENCE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, sentence, variants=(None,)):
+        """Return the cached pairs for sentence under the first variant that has them, or None on a miss"""
+        if not self.max_entries:
+            return None
+        sentence = sentence_key(sentence)
+        with self._lock:
+            for variant in variants:
+                key = (variant, sentence)
+                pairs = self._entries.get(key)
+                if pairs is not None:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return pairs
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, sentence, pairs, variant=None):
+        if not self.max_entries:
+            return
+        with self._lock:
+            key = (variant, sentence_key(sentence))
+            self._entries[key] = list(pairs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return dict(
+                self._counters,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                hit_rate=self._counters['hits'] / lookups if lookups else None
+            )
+
+
+# Shared by every HindiQAGenerator in the process
+sentence_cache = SentenceCache()
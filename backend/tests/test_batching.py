@@ -0,0 +1,62 @@
+import time
+import threading
+
+import pytest
+
+from core.batching import MicroBatcher
+
+
+def test_results_come_back_in_order_in_bounded_batches():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher('double', double, max_batch_size=4, max_wait_ms=50)
+    assert batcher.submit_many(list(range(10))) == [item * 2 for item in range(10)]
+    assert batcher.submit(21) == 42
+    assert max(sizes) <= 4
+    stats = batcher.stats()
+    assert stats['items'] == 11
+    assert stats['batches'] == len(sizes)
+    assert stats['queue_depth'] == 0
+
+
+def test_items_from_concurrent_callers_share_batches():
+    release = threading.Event()
+    sizes = []
+
+    def echo(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher('echo', echo, max_batch_size=8, max_wait_ms=50)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.setdefault(i, batcher.submit(i))) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    # Hold the first batch until every item is queued or taken
+    deadline = time.monotonic() + 5
+    while batcher.stats()['items'] + batcher.stats()['queue_depth'] < 6 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == {i: i for i in range(6)}
+    assert len(sizes) < 6
+
+
+def test_failures_reach_every_caller_in_the_batch():
+    def fail(items):
+        raise RuntimeError('model failed')
+
+    batcher = MicroBatcher('fail', fail)
+    with pytest.raises(RuntimeError, match='model failed'):
+        batcher.submit('item')
+
+    short = MicroBatcher('short', lambda items: items[:-1])
+    with pytest.raises(RuntimeError, match='returned 1 results for 2 items'):
+        short.submit_many(['a', 'b'])
+    assert short.stats()['errors'] == 1
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from core import bulk
+
+
+def write_records(path, records, tail=''):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + tail, encoding='utf-8')
+
+
+def test_rerun_with_qa_redoes_files_done_without_it(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    write_records(output, [
+        {'sha256': 'a', 'status': 'ok', 'options': bulk.run_options()},
+        {'sha256': 'b', 'status': 'ok', 'options': bulk.run_options(True, 'greedy')},
+        {'sha256': 'c', 'status': 'ok', 'options': bulk.run_options(True, 'full_beam')},
+        {'sha256': 'd', 'status': 'error', 'options': bulk.run_options(True, 'full_beam')},
+    ])
+    assert bulk.load_completed(str(output), bulk.run_options()) == {'a', 'b', 'c'}
+    assert bulk.load_completed(str(output), bulk.run_options(True, 'full_beam')) == {'c'}
+
+
+def test_truncated_last_record_is_dropped(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    write_records(output, [{'sha256': 'a', 'status': 'ok'}], tail='{"sha256": "b", "sta')
+    assert bulk.load_completed(str(output), bulk.run_options()) == {'a'}
+    assert output.read_text(encoding='utf-8').endswith('}\n')
+
+
+def test_qa_failure_is_recorded_per_file(tmp_path, monkeypatch):
+    pytest.importorskip('indicnlp')
+    import ocr.hindi_ocr
+    import qa.question_answer
+
+    def failing_qa(text, tier=None, details=None):
+        raise RuntimeError('generate failed')
+
+    image = tmp_path / 'page.png'
+    image.write_bytes(b'not really a png')
+    monkeypatch.setattr(ocr.hindi_ocr, 'perform_hindi_ocr', lambda file, details=None: 'हिंदी पाठ')
+    monkeypatch.setattr(qa.question_answer, 'qa_all', failing_qa)
+    monkeypatch.setattr(bulk, '_with_qa', True)
+
+    record = bulk.process_file(str(image))
+    assert record['status'] == 'error'
+    assert record['error'] == 'generate failed'
+    assert record['text'] == 'हिंदी पाठ'
@@ -0,0 +1,57 @@
+from bench.stubs import StubTokenizer
+from qa.contexts import ContextWindow, MIN_CONTEXT_CHARS, pack_contexts, single_sentence_contexts
+
+SENTENCES = [
+    'ताजमहल आगरा शहर में यमुना नदी के किनारे स्थित है।',
+    'इसे मुगल बादशाह शाहजहाँ ने बनवाया था।',
+    'इसका निर्माण सन् 1632 में शुरू हुआ था।',
+    'यह सफेद संगमरमर से बना है।',
+    'हर साल लाखों पर्यटक इसे देखने आते हैं।',
+]
+tokenizer = StubTokenizer()
+
+
+def tokens(text):
+    return len(tokenizer.tokenize(text))
+
+
+def test_single_sentence_contexts_skip_short_sentences():
+    windows = single_sentence_contexts(SENTENCES + ['छोटा वाक्य।', '   '])
+    assert [window.text for window in windows] == SENTENCES
+    assert all(len(window.text) >= MIN_CONTEXT_CHARS for window in windows)
+
+
+def test_windows_fit_the_budget_and_keep_every_sentence_in_order():
+    windows = pack_contexts(SENTENCES, tokenizer, max_tokens=20, overlap=1, reserved_tokens=2)
+    assert len(windows) > 1
+    assert all(tokens(window.text) <= 18 for window in windows)
+    seen = []
+    for window in windows:
+        seen.extend(sentence for sentence in window.sentences if sentence not in seen)
+    assert seen == SENTENCES
+
+
+def test_windows_overlap_by_the_configured_sentences():
+    windows = pack_contexts(SENTENCES, tokenizer, max_tokens=20, overlap=1)
+    for previous, window in zip(windows, windows[1:]):
+        assert window.sentences[0] == previous.sentences[-1]
+        assert len(window.sentences) > 1
+
+    disjoint = pack_contexts(SENTENCES, tokenizer, max_tokens=20, overlap=0)
+    assert sum(len(window.sentences) for window in disjoint) == len(SENTENCES)
+
+
+def test_sentence_over_the_budget_is_split_at_word_boundaries():
+    long_sentence = ' '.join(SENTENCES)
+    windows = pack_contexts([long_sentence], tokenizer, max_tokens=10, overlap=0)
+    assert all(tokens(window.text) <= 10 for window in windows)
+    assert ' '.join(window.text for window in windows) == long_sentence
+
+
+def test_source_sentence_of_an_answer():
+    window = ContextWindow(SENTENCES[:3])
+    assert window.source_sentence('शाहजहाँ') == SENTENCES[1]
+    assert window.source_sentence('1632') == SENTENCES[2]
+    # Not a span of the context: the sentence sharing the most words
+    assert window.source_sentence('मुगल बादशाह शाहजहाँ द्वारा') == SENTENCES[1]
+    assert ContextWindow(SENTENCES[:1]).source_sentence('') == SENTENCES[0]
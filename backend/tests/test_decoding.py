@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from qa import decoding
+from qa.decoding import LatencyBudget, TIER_ORDER, resolve_tier, tiers_at_least
+
+
+@pytest.fixture(autouse=True)
+def observed_costs(monkeypatch):
+    costs = {}
+    monkeypatch.setattr(decoding, '_observed_costs', costs)
+    return costs
+
+
+def test_resolve_tier():
+    assert resolve_tier('greedy') == 'greedy'
+    assert resolve_tier() == decoding.DEFAULT_QG_TIER
+    with pytest.raises(ValueError):
+        resolve_tier('fastest')
+
+
+def test_tiers_at_least():
+    assert tiers_at_least(TIER_ORDER[0]) == TIER_ORDER[:1]
+    assert tiers_at_least('greedy') == TIER_ORDER
+
+
+def test_unmeasured_tiers_keep_the_requested_tier():
+    assert LatencyBudget(10, 'full_beam').choose(100, 10) == 'full_beam'
+
+
+def test_budget_steps_down_to_a_tier_that_fits_and_never_back_up(observed_costs):
+    observed_costs['full_beam'] = 1.0
+    budget = LatencyBudget(10, 'full_beam')
+    # 20 sentences: full_beam needs 20s, small_beam 9s
+    assert budget.choose(20, 5) == 'small_beam'
+    observed_costs['full_beam'] = 0.01
+    assert budget.choose(20, 5) == 'small_beam'
+
+
+def test_budget_gives_up_when_not_even_a_chunk_fits(observed_costs):
+    observed_costs['greedy'] = 1.0
+    budget = LatencyBudget(3, 'full_beam')
+    assert budget.choose(100, 2) == 'greedy'
+    assert budget.choose(100, 5) is None
+
+    budget.deadline = time.monotonic() - 1
+    assert budget.choose(1, 1) is None
+
+
+def test_record_smooths_per_sentence_cost(observed_costs):
+    budget = LatencyBudget(10, 'full_beam')
+    budget.record('greedy', 10, 1.0)
+    assert observed_costs['greedy'] == pytest.approx(0.1)
+    budget.record('greedy', 10, 2.0)
+    assert observed_costs['greedy'] == pytest.approx(0.3 * 0.2 + 0.7 * 0.1)
+    budget.record('greedy', 0, 5.0)
+    assert observed_costs['greedy'] == pytest.approx(0.13)
+
+
+def test_estimate_scales_from_the_nearest_measured_tier(observed_costs):
+    budget = LatencyBudget(10, 'full_beam')
+    # Insertion order must not matter
+    observed_costs['greedy'] = 0.2
+    observed_costs['full_beam'] = 2.0
+    assert budget._estimate('small_beam', 10) == pytest.approx(2.0 * 0.45 * 10)
+    assert budget._estimate('greedy', 10) == pytest.approx(2.0)
+
+    observed_costs.clear()
+    observed_costs['full_beam'] = 2.0
+    observed_costs['greedy'] = 0.1
+    assert budget._estimate('small_beam', 10) == pytest.approx(2.0 * 0.45 * 10)
+
+    observed_costs.clear()
+    observed_costs['greedy'] = 0.1
+    observed_costs['small_beam'] = 0.9
+    assert budget._estimate('full_beam', 10) == pytest.approx(0.9 / 0.45 * 10)
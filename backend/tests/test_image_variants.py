@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+
+from ocr.hindi_ocr import ImageVariants
+
+
+def page():
+    image = np.full((60, 80, 3), 255, np.uint8)
+    image[20:40, 10:70] = 0
+    return image
+
+
+def test_variants_are_built_once_and_kept():
+    variants = ImageVariants(page())
+    enhanced = variants['enhanced']
+    assert variants['enhanced'] is enhanced
+    assert variants.materialized == ['original', 'enhanced']
+
+
+def test_reading_a_built_variant_does_not_wait_for_a_build():
+    variants = ImageVariants(page())
+    building = threading.Event()
+    release = threading.Event()
+    build_enhanced = variants._builders['enhanced']
+
+    def slow_build():
+        building.set()
+        release.wait(5)
+        return build_enhanced()
+
+    variants._builders['enhanced'] = slow_build
+    builder = threading.Thread(target=lambda: variants['enhanced'])
+    builder.start()
+    try:
+        assert building.wait(5)
+        # The build holds the lock; the original must still be readable
+        reader = threading.Thread(target=lambda: variants['original'])
+        reader.start()
+        reader.join(1)
+        assert not reader.is_alive()
+    finally:
+        release.set()
+        builder.join(5)
+    assert 'enhanced' in variants.materialized
@@ -0,0 +1,54 @@
+import os
+import stat
+import time
+import threading
+from multiprocessing import connection
+
+import pytest
+
+from core.inference_server import InferenceClient, InferenceServer, RemoteInferenceError, key_path
+
+
+@pytest.fixture
+def address(tmp_path, monkeypatch):
+    monkeypatch.delenv('INFERENCE_SERVER_AUTHKEY', raising=False)
+    address = str(tmp_path / 'inference.sock')
+    threading.Thread(target=InferenceServer(address).serve_forever, daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(address) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return address
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_socket_and_key_are_private_to_the_user(address):
+    assert mode(address) == 0o600
+    assert mode(key_path(address)) == 0o600
+
+
+def test_clients_with_the_key_are_served(address):
+    assert InferenceClient(address, connect_timeout=5).stats()['pid'] == os.getpid()
+
+
+def test_clients_without_the_key_are_refused(address):
+    with pytest.raises(connection.AuthenticationError):
+        connection.Client(address, family='AF_UNIX', authkey=b'not the key')
+    # A client that never answers the challenge holds up no one else
+    silent = connection.Client(address, family='AF_UNIX')
+    assert InferenceClient(address, connect_timeout=5).stats()['pid'] == os.getpid()
+    silent.close()
+
+
+def test_key_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('INFERENCE_SERVER_AUTHKEY', 'shared secret')
+    address = str(tmp_path / 'inference.sock')
+    threading.Thread(target=InferenceServer(address).serve_forever, daemon=True).start()
+    assert InferenceClient(address, connect_timeout=5).stats()['pid'] == os.getpid()
+    assert not os.path.exists(key_path(address))
+
+    monkeypatch.setenv('INFERENCE_SERVER_AUTHKEY', 'another secret')
+    with pytest.raises(RemoteInferenceError, match='rejected the authkey'):
+        InferenceClient(address, connect_timeout=5).stats()
@@ -0,0 +1,67 @@
+import os
+import time
+import sqlite3
+
+from core import jobs
+from core.jobs import JobManager
+
+
+def wait_for(manager, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} is {manager.get(job_id)['status']}, not {status}")
+
+
+def leave_job(directory, job_id, status, owner, boot_id, image=b'image', register_owner=True):
+    """Write a job as a worker that then exited would have left it"""
+    if image is not None:
+        with open(os.path.join(directory, f'{job_id}.img'), 'wb') as f:
+            f.write(image)
+    conn = sqlite3.connect(os.path.join(directory, 'jobs.sqlite3'))
+    with conn:
+        conn.execute(
+            'INSERT INTO jobs (id, status, owner, boot_id, image_path, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, status, owner, boot_id, os.path.join(directory, f'{job_id}.img'), time.time(), time.time())
+        )
+        if register_owner:
+            conn.execute(
+                'INSERT INTO owners (boot_id, pid, process_start, started) VALUES (?, ?, ?, ?)',
+                (boot_id, owner, 'an earlier boot:1', time.time())
+            )
+    conn.close()
+
+
+def test_submitted_job_runs(tmp_path):
+    manager = JobManager(str(tmp_path), handler=lambda data: {'size': len(data)})
+    job_id = manager.submit(b'12345')
+    assert wait_for(manager, job_id, jobs.DONE)['result'] == {'size': 5}
+    assert not os.path.exists(os.path.join(str(tmp_path), f'{job_id}.img'))
+
+
+def test_job_of_a_restarted_worker_with_the_same_pid_is_recovered(tmp_path):
+    # Creates the schema
+    JobManager(str(tmp_path), handler=lambda data: None)
+    leave_job(str(tmp_path), 'orphan', jobs.RUNNING, os.getpid(), 'old-boot')
+
+    manager = JobManager(str(tmp_path), handler=lambda data: data.decode())
+    assert wait_for(manager, 'orphan', jobs.DONE)['result'] == 'image'
+
+
+def test_job_of_a_live_manager_is_left_alone(tmp_path):
+    owner = JobManager(str(tmp_path), handler=lambda data: None)
+    leave_job(str(tmp_path), 'busy', jobs.QUEUED, os.getpid(), owner.boot_id, register_owner=False)
+
+    manager = JobManager(str(tmp_path), handler=lambda data: None)
+    assert manager.get('busy')['status'] == jobs.QUEUED
+
+
+def test_job_without_its_image_is_failed(tmp_path):
+    JobManager(str(tmp_path), handler=lambda data: None)
+    leave_job(str(tmp_path), 'lost', jobs.QUEUED, os.getpid(), 'old-boot', image=None)
+
+    manager = JobManager(str(tmp_path), handler=lambda data: None)
+    assert manager.get('lost')['status'] == jobs.FAILED
@@ -0,0 +1,75 @@
+import os
+import json
+import subprocess
+import sys
+
+from core.metrics import Metrics, SnapshotExporter, merge_snapshots
+
+
+def total(snapshots, name='requests_total'):
+    counters, _ = merge_snapshots(snapshots)
+    return sum(value for (counter, _), value in counters.items() if counter == name)
+
+
+def exited_pid():
+    """Pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def leave_snapshot(directory, name, count, pid, process_start='an earlier boot:1'):
+    metrics = Metrics()
+    metrics.inc('requests_total', count, endpoint='ocr')
+    metrics.observe('stage_duration_seconds', 0.2, stage='request')
+    with open(os.path.join(directory, name), 'w') as f:
+        json.dump({'pid': pid, 'process_start': process_start, 'snapshot': metrics.snapshot()}, f)
+
+
+def test_exited_workers_are_merged_and_counters_never_go_back(tmp_path):
+    directory = str(tmp_path)
+    metrics = Metrics()
+    metrics.inc('requests_total', 2, endpoint='ocr')
+    exporter = SnapshotExporter(metrics, directory)
+    leave_snapshot(directory, 'a.json', 3, exited_pid())
+    # Same pid as this process, but a different process: the pid was reused
+    leave_snapshot(directory, 'b.json', 5, os.getpid())
+
+    assert total(exporter.collect()) == 10
+    assert sorted(name for name in os.listdir(directory) if name.endswith('.json')) == sorted(
+        [os.path.basename(exporter._path()), 'retired.json'])
+
+    leave_snapshot(directory, 'c.json', 11, exited_pid())
+    snapshots = exporter.collect()
+    assert total(snapshots) == 21
+    assert merge_snapshots(snapshots)[1][('stage_duration_seconds', (('stage', 'request'),))]['count'] == 3
+    # A second exporter sharing the directory sees the same totals
+    assert total(SnapshotExporter(Metrics(), directory).collect()) == 21
+
+
+def test_live_workers_are_kept_and_each_process_gets_its_own_file(tmp_path):
+    directory = str(tmp_path)
+    first = SnapshotExporter(Metrics(), directory)
+    second = SnapshotExporter(Metrics(), directory)
+    first.metrics.inc('requests_total', 1, endpoint='ocr')
+    second.metrics.inc('requests_total', 4, endpoint='ocr')
+    first.flush()
+    assert first._path() != second._path()
+    assert total(second.collect()) == 5
+    assert not os.path.exists(os.path.join(directory, 'retired.json'))
+
+
+def test_file_already_merged_before_a_crash_is_not_counted_twice(tmp_path):
+    directory = str(tmp_path)
+    leave_snapshot(directory, 'd.json', 3, exited_pid())
+    exporter = SnapshotExporter(Metrics(), directory)
+    assert total(exporter.collect()) == 3
+    # As if the scrape had died after writing retired.json but before deleting d.json
+    leave_snapshot(directory, 'd.json', 3, exited_pid())
+    with open(os.path.join(directory, 'retired.json')) as f:
+        retired = json.load(f)
+    with open(os.path.join(directory, 'retired.json'), 'w') as f:
+        json.dump(dict(retired, files=['d.json']), f)
+
+    assert total(exporter.collect()) == 3
+    assert not os.path.exists(os.path.join(directory, 'd.json'))
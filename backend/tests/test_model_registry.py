@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from core import model_registry
+from core.model_registry import ModelRegistry
+
+
+class Flaky:
+    """Loader that fails until told to succeed"""
+
+    def __init__(self):
+        self.works = False
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if not self.works:
+            raise RuntimeError('download failed')
+        return object()
+
+
+def warmed_registry(**loaders):
+    registry = ModelRegistry()
+    for name, (loader, has_fallback) in loaders.items():
+        registry.register(name, loader, has_fallback=has_fallback)
+    registry.warm_up()
+    registry._warm_up_done.set()
+    return registry
+
+
+@pytest.mark.parametrize('warmup', [True, False])
+def test_failed_model_with_a_fallback_does_not_block_readiness(monkeypatch, warmup):
+    monkeypatch.setattr(model_registry, 'WARMUP_ENABLED', warmup)
+    registry = warmed_registry(easyocr=(Flaky(), True), qa_pipeline=(object, False))
+    ready, models = registry.readiness()
+    assert ready
+    assert models['easyocr']['state'] == 'failed'
+
+
+@pytest.mark.parametrize('warmup', [True, False])
+def test_failed_model_without_a_fallback_blocks_readiness_until_a_retry_loads_it(monkeypatch, warmup):
+    monkeypatch.setattr(model_registry, 'WARMUP_ENABLED', warmup)
+    loader = Flaky()
+    registry = warmed_registry(easyocr=(object, True), qa_pipeline=(loader, False))
+    ready, models = registry.readiness()
+    assert not ready
+    assert models['qa_pipeline']['error'] == 'download failed'
+
+    loader.works = True
+    deadline = time.monotonic() + 5
+    while not registry.readiness()[0] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert registry.readiness()[0]
+    assert registry.is_loaded('qa_pipeline')
@@ -0,0 +1,36 @@
+from qa.near_duplicates import NearDuplicateFilter, minhash, shingles
+
+SENTENCE = 'ताजमहल आगरा शहर में यमुना नदी के किनारे स्थित है।'
+
+
+def test_shingles():
+    assert shingles('क  ख') == {'क ख'}
+    assert shingles('abcdef', size=4) == {'abcd', 'bcde', 'cdef'}
+
+
+def test_signature_ignores_whitespace_differences():
+    assert (minhash(SENTENCE) == minhash('  ' + SENTENCE.replace(' ', '   '))).all()
+
+
+def test_repeats_are_flagged_and_new_sentences_remembered():
+    seen = NearDuplicateFilter(threshold=0.7)
+    assert not seen.is_duplicate(SENTENCE)
+    assert seen.is_duplicate(SENTENCE)
+    # An OCR slip in one character is still a repeat
+    assert seen.is_duplicate(SENTENCE.replace('यमुना', 'यमूना'))
+    assert not seen.is_duplicate('इसे मुगल बादशाह शाहजहाँ ने अपनी पत्नी की याद में बनवाया था।')
+    assert seen.is_duplicate('इसे मुगल बादशाह शाहजहाँ ने अपनी पत्नी की याद में बनवाया था।')
+
+
+def test_threshold_decides_how_near_a_repeat_must_be():
+    # One changed vowel sign leaves about 0.84 of this short sentence's shingles shared
+    slipped = SENTENCE.replace('यमुना', 'यमूना')
+    strict = NearDuplicateFilter(threshold=0.95)
+    assert not strict.is_duplicate(SENTENCE)
+    assert not strict.is_duplicate(slipped)
+
+
+def test_threshold_above_one_keeps_every_sentence():
+    seen = NearDuplicateFilter(threshold=1.01)
+    assert not seen.is_duplicate(SENTENCE)
+    assert not seen.is_duplicate(SENTENCE)
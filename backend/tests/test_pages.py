@@ -0,0 +1,52 @@
+import io
+from types import SimpleNamespace
+
+from PIL import Image
+
+from ocr import pages
+from ocr.decode import ImageTooLarge
+from ocr.pages import iter_pages
+
+
+def tiff(*sizes):
+    frames = [Image.new('L', size, 255) for size in sizes]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format='TIFF', save_all=True, append_images=frames[1:])
+    buffer.seek(0)
+    return buffer
+
+
+def test_oversized_tiff_frames_are_reported_not_decoded(monkeypatch):
+    encoded = []
+    monkeypatch.setattr(pages, '_encode_png', lambda frame: encoded.append(frame.size) or b'png')
+    result = list(iter_pages(tiff((100, 100), (400, 400), (50, 80)), 'scan.tiff', max_pixels=100_000))
+    assert result[0] == b'png' and result[2] == b'png'
+    assert isinstance(result[1], ImageTooLarge)
+    assert encoded == [(100, 100), (50, 80)]
+
+
+def test_oversized_pdf_pages_are_not_rasterized(monkeypatch):
+    class Page:
+        def __init__(self, width, height):
+            self.rect = SimpleNamespace(width=width, height=height)
+
+        def get_pixmap(self, dpi):
+            assert self.rect.width < 1000, 'oversized page was rasterized'
+            return SimpleNamespace(tobytes=lambda kind: b'png')
+
+    class Document(list):
+        def close(self):
+            pass
+
+    # A4 at 200 DPI is about 3.9 megapixels; a 2000 x 2000 point page about 31
+    document = Document([Page(595, 842), Page(2000, 2000)])
+    monkeypatch.setattr(pages, 'fitz', SimpleNamespace(open=lambda **kwargs: document))
+    monkeypatch.setattr(pages, 'PDF_DPI', 200)
+    result = list(iter_pages(io.BytesIO(b'%PDF'), 'book.pdf', max_pixels=10_000_000))
+    assert result[0] == b'png'
+    assert isinstance(result[1], ImageTooLarge)
+
+
+def test_rejected_pages_get_an_error_text_in_order():
+    result = pages.ocr_pages([('scan.tiff', 2, ImageTooLarge('too big'))])
+    assert [(page['source'], page['page'], page['text']) for page in result] == [('scan.tiff', 2, 'Error: too big')]
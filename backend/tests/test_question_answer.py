@@ -0,0 +1,108 @@
+import logging
+
+import pytest
+
+pytest.importorskip('indicnlp')
+
+from bench import stubs
+from bench.synthetic import SAMPLE_SENTENCES
+from qa.decoding import TIER_ORDER
+from qa import question_answer
+from qa.question_answer import HindiQAGenerator
+
+
+def make_generator(qa_pipeline=None, **kwargs):
+    return HindiQAGenerator(
+        qg_tokenizer=stubs.StubTokenizer(),
+        qg_model=stubs.StubQGModel(),
+        qa_pipeline=qa_pipeline or stubs.StubQAPipeline(),
+        **kwargs
+    )
+
+
+def qa_pairs(generator):
+    questions = [
+        'ताजमहल कहाँ स्थित है?',
+        'ताजमहल को यूनेस्को की विश्व धरोहर स्थल कब घोषित किया गया था?',
+        'ताजमहल का निर्माण कब शुरू हुआ था?',
+    ]
+    generated = generator.generate_questions_batch(SAMPLE_SENTENCES)
+    return ([(question, context) for context, qs in zip(SAMPLE_SENTENCES, generated) for question in qs] +
+            [(question, ' '.join(SAMPLE_SENTENCES[:4])) for question in questions])
+
+
+@pytest.mark.parametrize('threshold', [0, None])
+def test_batched_answers_match_one_at_a_time(threshold):
+    generator = make_generator(rule_answer_threshold=threshold)
+    pairs = qa_pairs(generator)
+    assert generator.extract_answers_batch(pairs) == [generator.extract_answer(q, c) for q, c in pairs]
+
+
+def test_failed_batch_falls_back_to_single_calls(caplog):
+    class SinglesOnly(stubs.StubQAPipeline):
+        def __call__(self, question, context, **kwargs):
+            if not isinstance(question, str):
+                raise RuntimeError('batch failed')
+            return super().__call__(question, context, **kwargs)
+
+    generator = make_generator(SinglesOnly(), rule_answer_threshold=0)
+    reference = make_generator(rule_answer_threshold=0)
+    pairs = qa_pairs(generator)
+    with caplog.at_level(logging.ERROR):
+        assert generator.extract_answers_batch(pairs) == [reference.extract_answer(q, c) for q, c in pairs]
+    assert 'batch failed' in caplog.text
+
+
+def test_given_models_are_used_with_cross_request_batching(monkeypatch):
+    monkeypatch.setattr(question_answer, 'BATCHING_ENABLED', True)
+    # The shared batchers run the registry's models, not these
+    batchers = []
+    monkeypatch.setattr(question_answer, 'get_batcher', lambda *args: batchers.append(args))
+    generator = make_generator(rule_answer_threshold=0)
+    pairs = qa_pairs(generator)
+    assert generator.extract_answers_batch(pairs) == [generator.extract_answer(q, c) for q, c in pairs]
+    assert (generator.generate_questions_batch(SAMPLE_SENTENCES) ==
+            [generator.generate_questions(context) for context in SAMPLE_SENTENCES])
+    assert batchers == []
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 3, 8])
+@pytest.mark.parametrize('tier', TIER_ORDER)
+def test_batched_questions_match_one_at_a_time(batch_size, tier):
+    generator = make_generator()
+    contexts = SAMPLE_SENTENCES + [' '.join(SAMPLE_SENTENCES[:3]), SAMPLE_SENTENCES[0]]
+    assert (generator.generate_questions_batch(contexts, batch_size, tier) ==
+            [generator.generate_questions(context, tier) for context in contexts])
+
+
+def test_rejected_model_answer_falls_back_to_the_clause():
+    class Unsure(stubs.StubQAPipeline):
+        def _answer(self, question, context):
+            return {'answer': 'x', 'score': 0.0, 'start': 0, 'end': 1}
+
+    context = 'ताजमहल भारत के आगरा शहर में यमुना नदी के किनारे स्थित है।'
+    generator = make_generator(Unsure(), rule_answer_threshold=0)
+    expected = 'ताजमहल भारत के आगरा शहर में यमुना नदी के किनारे स्थित है'
+    assert generator.extract_answer('ताजमहल कहाँ स्थित है?', context) == expected
+    assert generator.extract_answers_batch([('ताजमहल कहाँ स्थित है?', context)]) == [expected]
+
+
+def test_only_same_length_sentences_share_a_batch(monkeypatch):
+    generator = make_generator()
+    batches = []
+    generate = generator.qg_model.generate
+    monkeypatch.setattr(generator.qg_model, 'generate', lambda input_ids, **kwargs: (
+        batches.append([len(tokens) for tokens in input_ids]) or generate(input_ids, **kwargs)))
+    contexts = ['एक दो तीन', 'चार पाँच छह', 'सात आठ नौ', 'दस ग्यारह', 'बारह']
+    generator.generate_questions_batch(contexts, batch_size=2)
+    # With the two prompt words: three of 5 tokens, one of 4 and one of 3
+    assert sorted(batches) == [[3], [4], [5], [5, 5]]
+
+
+def test_padded_batches_can_change_questions(monkeypatch):
+    monkeypatch.setattr(question_answer, 'QG_PADDED_BATCHES', True)
+    generator = make_generator()
+    contexts = SAMPLE_SENTENCES
+    # The test model answers differently for padded input, as beam search may
+    assert (generator.generate_questions_batch(contexts, 8) !=
+            [generator.generate_questions(context) for context in contexts])
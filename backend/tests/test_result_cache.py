@@ -0,0 +1,65 @@
+import time
+
+from core.result_cache import ResultCache, cache_key
+
+
+def test_key_depends_on_image_and_config():
+    key = cache_key(b'image', {'a': 1, 'b': 2})
+    assert key == cache_key(b'image', {'b': 2, 'a': 1})
+    assert key != cache_key(b'image', {'a': 1, 'b': 3})
+    assert key != cache_key(b'other', {'a': 1, 'b': 2})
+
+
+def test_values_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = ResultCache(path)
+    writer.set('key', {'text': 'नमस्ते'})
+    assert writer.get('key') == {'text': 'नमस्ते'}
+
+    reader = ResultCache(path)
+    assert reader.get('key') == {'text': 'नमस्ते'}
+    assert reader.get('key') == {'text': 'नमस्ते'}
+    assert reader.get('missing') is None
+    stats = reader.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), ttl=0.05)
+    cache.set('key', 1)
+    time.sleep(0.1)
+    assert cache.get('key') is None
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_memory_tier_keeps_the_most_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), max_memory_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    stats = cache.stats()
+    assert stats['memory_entries'] == 2
+    assert (stats['memory_evictions'], stats['disk_evictions']) == (1, 0)
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['memory_hits'] == 3
+    # b was evicted from memory but is still on disk
+    assert cache.get('b') == 2
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_keeps_the_most_recently_read(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = ResultCache(path, max_memory_entries=0, max_disk_entries=2)
+    cache.set('a', 1)
+    time.sleep(0.01)
+    cache.set('b', 2)
+    time.sleep(0.01)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.stats()['disk_evictions'] == 1
+    reader = ResultCache(path)
+    assert reader.stats()['disk_entries'] == 2
+    assert reader.get('b') is None
+    assert reader.get('a') == 1 and reader.get('c') == 3
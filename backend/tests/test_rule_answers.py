@@ -0,0 +1,90 @@
+from qa.rule_answers import RULE_ANSWER_THRESHOLD, LOCATION_CONFIDENCE_CAP, ContextIndex
+
+GANGA = 'गंगा नदी हिमालय के गंगोत्री हिमनद से निकलती है और बंगाल की खाड़ी में गिरती है।'
+GANDHI = 'महात्मा गांधी का जन्म 1869 में पोरबंदर में हुआ था।'
+TAJ = 'ताजमहल भारत के आगरा शहर में यमुना नदी के किनारे स्थित है।'
+UNESCO = 'ताजमहल को 1983 में यूनेस्को की विश्व धरोहर स्थल घोषित किया गया था।'
+BUILT = 'यह संगमरमर से बना है और इसका निर्माण 1632 में शुरू हुआ था और 1653 में पूरा हुआ था।'
+
+
+def answer(sentence, question):
+    return ContextIndex(sentence, [sentence]).answer(question)
+
+
+def test_where_from_takes_the_ablative_phrase():
+    result = answer(GANGA, 'गंगा नदी कहाँ से निकलती है?')
+    assert result.kind == 'location'
+    assert result.answer == 'हिमालय के गंगोत्री हिमनद से'
+
+
+def test_where_takes_the_locative_phrase_not_the_verb():
+    assert answer(GANGA, 'गंगा नदी कहाँ गिरती है?').answer == 'बंगाल की खाड़ी में'
+
+
+def test_location_skips_years():
+    assert answer(GANDHI, 'महात्मा गांधी का जन्म कहाँ हुआ था?').answer == 'पोरबंदर में'
+
+
+def test_single_word_place():
+    assert answer('राम स्कूल में है।', 'राम कहाँ है?').answer == 'स्कूल में'
+
+
+def test_two_place_phrases_are_ambiguous():
+    result = answer(TAJ, 'ताजमहल कहाँ स्थित है?')
+    assert result.answer == 'भारत के आगरा शहर में'
+    assert result.confidence < LOCATION_CONFIDENCE_CAP
+
+
+def test_single_place_phrase_skips_the_model_by_default():
+    for sentence, question in [(GANGA, 'गंगा नदी कहाँ से निकलती है?'),
+                               (GANDHI, 'महात्मा गांधी का जन्म कहाँ हुआ था?'),
+                               ('राम स्कूल में है।', 'राम कहाँ है?')]:
+        confidence = answer(sentence, question).confidence
+        assert RULE_ANSWER_THRESHOLD <= confidence <= LOCATION_CONFIDENCE_CAP
+    assert answer(TAJ, 'ताजमहल कहाँ स्थित है?').confidence < RULE_ANSWER_THRESHOLD
+
+
+def test_fallback_keeps_the_clause_or_sentence():
+    assert answer(TAJ, 'ताजमहल कहाँ स्थित है?').fallback == 'ताजमहल भारत के आगरा शहर में यमुना नदी के किनारे स्थित है'
+    assert answer(GANDHI, 'महात्मा गांधी का जन्म कहाँ हुआ था?').fallback == GANDHI
+    assert answer(UNESCO, 'ताजमहल को यूनेस्को की विश्व धरोहर स्थल कब घोषित किया गया था?').fallback == UNESCO
+
+
+def test_when_with_a_single_year_is_confident():
+    result = answer(UNESCO, 'ताजमहल को यूनेस्को की विश्व धरोहर स्थल कब घोषित किया गया था?')
+    assert result == ('1983', 1.0, 'time', UNESCO)
+
+
+def test_when_with_several_years_defers_to_the_model():
+    result = answer(BUILT, 'ताजमहल का निर्माण कब शुरू हुआ था?')
+    assert result.answer == BUILT
+    assert result.confidence < RULE_ANSWER_THRESHOLD
+
+
+def test_year_in_the_question_is_not_the_answer():
+    assert answer(UNESCO, 'ताजमहल को 1983 में क्या घोषित किया गया था?').kind != 'time'
+
+
+def test_best_sentence_is_found_through_the_keyword_index():
+    index = ContextIndex(' '.join([TAJ, UNESCO]), [TAJ, UNESCO])
+    assert index.answer('ताजमहल को यूनेस्को की विश्व धरोहर स्थल कब घोषित किया गया था?').answer == '1983'
+
+
+def test_unmatched_question_falls_back_to_a_sentence():
+    index = ContextIndex(TAJ, [TAJ])
+    assert index.answer('यह क्या है?') == (TAJ, 0.0, 'first_sentence', TAJ)
+
+
+def test_full_date_is_answered_whole():
+    result = answer('भारत का संविधान 26 जनवरी 1950 को लागू हुआ था।', 'भारत का संविधान कब लागू हुआ था?')
+    assert result.kind == 'time'
+    assert result.answer == '26 जनवरी 1950'
+
+
+def test_durations_and_counts_are_not_years():
+    result = answer('यह मंदिर 1200 वर्ष पुराना है।', 'यह मंदिर कब बना था?')
+    assert result.kind != 'time'
+    assert result.confidence < RULE_ANSWER_THRESHOLD
+    assert answer('मेले में 1500 लोग आए।', 'मेले में कब लोग आए?').kind != 'time'
+    # Longer numbers are not years either
+    assert answer('इसकी ऊँचाई 12000 फीट है।', 'इसकी ऊँचाई कब मापी गई?').kind != 'time'
@@ -0,0 +1,35 @@
+import threading
+
+import numpy as np
+
+from ocr import hindi_ocr
+
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+
+def test_every_psm_reads_one_encoded_image(monkeypatch):
+    writes = []
+    real_imwrite = hindi_ocr.cv2.imwrite
+
+    def imwrite(path, image):
+        writes.append(path)
+        return real_imwrite(path, image)
+
+    runs = []
+
+    def run_tesseract(image_path, args, cancel_event=None, env=None):
+        runs.append(image_path)
+        return f'{TSV_HEADER}\n5\t1\t1\t1\t1\t1\t0\t0\t10\t10\t90\tभारत'
+
+    monkeypatch.setattr(hindi_ocr.cv2, 'imwrite', imwrite)
+    monkeypatch.setattr(hindi_ocr, '_run_tesseract', run_tesseract)
+    monkeypatch.setattr(hindi_ocr, 'check_tesseract_hindi', lambda: True)
+    monkeypatch.setattr(hindi_ocr, 'TESSERACT_STRATEGY', 'parallel')
+
+    image = np.zeros((8, 8), dtype=np.uint8)
+    text = hindi_ocr.use_tesseract_for_hindi({'original': image, 'enhanced': image}, threading.Event())
+
+    assert text == 'भारत'
+    assert len(writes) == 1
+    assert runs == writes * len(hindi_ocr.TESSERACT_PSM_MODES)
@@ -3,7 +3,6 @@ import './App.css';
 import UploadForm from './components/UploadForm';
 import ResultDisplay from './components/ResultDisplay';
 import LoadingSpinner from './components/LoadingSpinner';
-import axios from 'axios';
 
 const API_URL = 'http://localhost:5000';
 
@@ -23,15 +22,41 @@ function App() {
     formData.append('image', imageFile);
 
     try {
-      const response = await axios.post(`${API_URL}/api/ocr`, formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data'
-        }
+      // Stream the response: the OCR text arrives first, then QA pairs one by one
+      const response = await fetch(`${API_URL}/api/ocr/stream`, {
+        method: 'POST',
+        body: formData
       });
 
-      if (response.data) {
-        setExtractedText(response.data.text);
-        setQaResults(response.data.qa_pairs);
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      const handleEvent = (event) => {
+        if (event.type === 'text') {
+          setExtractedText(event.text);
+        } else if (event.type === 'qa_pair') {
+          setQaResults(prev => [...prev, { question: event.question, answer: event.answer }]);
+        } else if (event.type === 'error') {
+          throw new Error(event.message || event.error);
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) {
+        handleEvent(JSON.parse(buffer));
       }
     } catch (err) {
       console.error('Error processing image:', err);
@@ -51,16 +76,17 @@ function App() {
       <main className="app-main">
         <UploadForm onImageSubmit={processImage} />
 
-        {loading && <LoadingSpinner />}
-
         {error && <div className="error-message">{error}</div>}
 
-        {!loading && extractedText && (
+        {extractedText && (
           <ResultDisplay 
             extractedText={extractedText} 
             qaResults={qaResults} 
+            pending={loading}
           />
         )}
+
+        {loading && <LoadingSpinner />}
       </main>
 
       <footer className="app-footer">
@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import './ResultDisplay.css';
 
-const ResultDisplay = ({ extractedText, qaResults }) => {
+const ResultDisplay = ({ extractedText, qaResults, pending }) => {
   // State to track which answers are visible
   const [visibleAnswers, setVisibleAnswers] = useState({});
 
@@ -51,7 +51,7 @@ const ResultDisplay = ({ extractedText, qaResults }) => {
           </div>
         </div>
       ) : (
-        extractedText && (
+        extractedText && !pending && (
           <div className="no-questions">
             <p>No questions could be generated from the extracted text.</p>
           </div>